@@ -1,29 +1,68 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import difflib
-from rapidfuzz import process, fuzz
-import re
-import io
-from typing import Optional
+import functools
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
 
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
 from google.oauth2 import service_account
 
+from core import SCORE_FILTERS, PairsData, SjData, load_frame, today
+from data_source import GoogleDriveClient, LocalDriveClient, SnapshotStore, read_name_list
+from data_store import memory_report
+from instrumentation import active_trace, cache_probe, record_cache_miss, stage, start_run
+from prefetch import DEFAULT_INTERVAL, Prefetcher, activate
+from price_stats import TIME_WINDOWS
+from refresh import IncrementalRefresher
+from sj_backend import DuckDbSjBackend, PandasSjBackend
+from table_view import PAIR_FORMATS, format_columns, page_bounds, page_count, page_slice, render_comparison_cards
+
+
+# Frame data dibagikan antar sesi tanpa salinan; copy-on-write menjaga agar tidak ada sesi yang mengubahnya
+pd.set_option("mode.copy_on_write", True)
 
 # --- Konfigurasi Halaman Streamlit ---
 st.set_page_config(layout="wide", page_title="Dashboard Hasil Analisis Harga")
 
+@st.cache_resource
+def configure_logging() -> None:
+    """Log aplikasi ke stderr, termasuk baris JSON per tahap dari `instrumentation`; level lewat DASHBOARD_LOG_LEVEL."""
+    logging.basicConfig(level=os.environ.get("DASHBOARD_LOG_LEVEL", "INFO"),
+                        format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+configure_logging()
+
+# Instrumentasi per rerun: waktu tiap tahap, cache hit/miss, dan (opsional) delta memori puncak
+if 'diag_session' not in st.session_state:
+    st.session_state.diag_session = uuid.uuid4().hex[:8]
+RUN_TRACE = start_run(st.session_state.diag_session, track_memory=st.session_state.get('diag_track_memory', False))
+
 st.title("📊 Dashboard Penampil Database Konsistensi Harga")
 st.write("Aplikasi ini menampilkan hasil analisis kemiripan barang dari database yang sudah diproses.")
 
 
 SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]  # read-only lebih aman
-CREDS = service_account.Credentials.from_service_account_info(
-    dict(st.secrets["gcp_service_account"]), scopes=SCOPES
-)
-DRIVE = build("drive", "v3", credentials=CREDS)
+
+# Direktori lokal berisi file <file_id>.xlsx untuk menggantikan Drive (uji lokal / offline).
+LOCAL_DRIVE_DIR = os.environ.get("DASHBOARD_LOCAL_DRIVE_DIR")
+# Lokasi snapshot Parquet hasil parsing Excel, dikunci oleh revisi file di Drive.
+SNAPSHOT_DIR = Path(os.environ.get("DASHBOARD_SNAPSHOT_DIR", ".cache/snapshots"))
+# Backend query Data SJ: "pandas" (in-memory) atau "duckdb" (file DuckDB lokal, filter via SQL).
+SJ_BACKEND = os.environ.get("DASHBOARD_SJ_BACKEND", "pandas")
+DUCKDB_DIR = Path(os.environ.get("DASHBOARD_DUCKDB_DIR", ".cache/duckdb"))
+# Interval (detik) prefetch latar belakang untuk mengecek revisi baru di Drive; 0 = nonaktif.
+PREFETCH_INTERVAL = float(os.environ.get("DASHBOARD_PREFETCH_INTERVAL", DEFAULT_INTERVAL))
+# State `refresh.py`. Jika diisi dan sudah pernah di-refresh, Data SJ dan master list dibaca dari sini
+# menggantikan FILE_ID_SJ, dan database kemiripannya menjadi default DASHBOARD_PAIRS_PATH.
+INCREMENTAL_DIR = os.environ.get("DASHBOARD_INCREMENTAL_DIR")
+REFRESHER = IncrementalRefresher(INCREMENTAL_DIR) if INCREMENTAL_DIR else None
+# Database kemiripan hasil `pairgen.py` (Parquet). Jika diisi dan file ada, dipakai menggantikan FILE_ID_DB.
+PAIRS_PATH = os.environ.get("DASHBOARD_PAIRS_PATH") or (str(REFRESHER.pairs_path) if REFRESHER else None)
 
 # --- Informasi File di Google Drive ---
 FILE_ID_DB = "1_CXkB0wkdj3MC7YdewWdYDxns4iplsXF"  # Database kemiripan (xlsx atau Google Sheet)
@@ -34,170 +73,184 @@ FILE_ID_SJ = "1NcsaPVBVqlg6fcKHS2XYxkzyPNGiAaYc"  # Data SJ (xlsx atau Google Sh
 SHEET_NAME_DB: Optional[str] = None  # mis. "Database"
 SHEET_NAME_SJ: Optional[str] = None  # mis. "Sheet1"
 
+# Jumlah kartu perbandingan side-by-side per halaman
+COMPARE_PAGE_SIZE = 20
+
+@st.cache_resource
+def get_snapshot_store() -> SnapshotStore:
+    """Client Drive dan penyimpanan snapshot, dibuat sekali per proses (bukan tiap rerun)."""
+    if LOCAL_DRIVE_DIR:
+        return SnapshotStore(LocalDriveClient(LOCAL_DRIVE_DIR), SNAPSHOT_DIR)
+    creds = service_account.Credentials.from_service_account_info(
+        dict(st.secrets["gcp_service_account"]), scopes=SCOPES
+    )
+    # Satu service per thread: prefetch mengunduh beberapa file secara paralel
+    return SnapshotStore(GoogleDriveClient(lambda: build("drive", "v3", credentials=creds)), SNAPSHOT_DIR)
+
 # --- Loader: dukung Excel privat & Google Spreadsheet privat ---
 @st.cache_data(ttl=3600)
-def load_excel_from_drive(file_id: str, sheet_name: Optional[str] = None) -> pd.DataFrame:
-    """Download file Excel privat dari Google Drive via Service Account dan load ke DataFrame.
+def get_snapshot(file_id: str, sheet_name: Optional[str] = None) -> Tuple[str, str]:
+    """Pastikan snapshot Parquet file Drive mutakhir tanpa memuatnya ke memori; (path, revisi).
+    - Jika revisi file di Drive (md5Checksum/modifiedTime) sama dengan snapshot lokal,
+      tidak ada download maupun parsing Excel.
     - Jika file adalah Google Spreadsheet, akan di-export ke XLSX dulu.
     - Pastikan file di-share ke client_email Service Account (Viewer/Editor).
     """
+    record_cache_miss("get_snapshot")
+    path, revision = get_snapshot_store().ensure(file_id, sheet_name)
+    return str(path), revision
+
+def snapshot_for(kind: str, file_id: str, sheet_name: Optional[str] = None) -> Tuple[str, str]:
+    """Snapshot yang sudah disiapkan prefetch latar belakang; jika belum ada, cek Drive langsung."""
+    current = get_prefetcher().current(kind)
+    if current is not None:
+        return str(current[0]), current[1]
+    with cache_probe("get_snapshot"):
+        return get_snapshot(file_id, sheet_name)
+
+# --- Data & indeks bersama dari `core`, dibangun sekali per revisi dan dipakai semua sesi ---
+@st.cache_resource(max_entries=2)
+def get_pairs_data(revision: str, path: str) -> PairsData:
+    """Database kemiripan yang sudah dinormalisasi dan dipadatkan, beserta filter, graf, dan daftar kategori."""
+    record_cache_miss("get_pairs_data")
+    return PairsData(load_frame(path, revision, "pairs"))
+
+@st.cache_resource(max_entries=2)
+def get_sj_data(revision: str, path: str, incremental: bool = False) -> SjData:
+    """Backend Data SJ (`SJ_BACKEND`) beserta master list dan statistik harga.
+
+    Dengan `incremental`, `path` adalah direktori part `REFRESHER` dan master list diambil dari
+    agregat yang sudah dipelihara refresh, bukan diagregasi ulang.
+    """
+    record_cache_miss("get_sj_data")
+    if SJ_BACKEND == "duckdb":
+        backend = DuckDbSjBackend(path, revision, DUCKDB_DIR)
+    else:
+        backend = PandasSjBackend(load_frame(path, revision, "sj"), revision)
+    return SjData(backend, REFRESHER.master_items() if incremental else None)
+
+def load_pairs_data() -> Optional[PairsData]:
+    """Database kemiripan untuk rerun ini; None (dengan pesan error) jika gagal dimuat."""
     try:
-        meta = DRIVE.files().get(fileId=file_id, fields="name,mimeType").execute()
-        mime = meta.get("mimeType", "")
-        name = meta.get("name", file_id)
-
-        # Tentukan request download
-        if mime == "application/vnd.google-apps.spreadsheet":
-            # Export Google Sheet menjadi XLSX
-            request = DRIVE.files().export_media(
-                fileId=file_id,
-                mimeType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
-        elif mime in ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "application/vnd.ms-excel"):
-            # XLSX/XLS asli
-            request = DRIVE.files().get_media(fileId=file_id)
-        else:
-            st.warning(f"File '{name}' (mimeType={mime}) bukan Excel/Spreadsheet. Pastikan formatnya XLSX atau Google Sheet.")
-            request = DRIVE.files().get_media(fileId=file_id)  # coba saja download biner
-
-        # Download konten ke BytesIO
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
-        fh.seek(0)
-
-        # Baca excel (bisa multi-sheet)
-        df = pd.read_excel(fh, sheet_name=sheet_name, engine="openpyxl")
-        if isinstance(df, dict):  # kalau multi-sheet dan sheet_name=None
-            first_key = list(df.keys())[0]
-            df = df[first_key]
-
-        # --- PERBAIKAN: Membersihkan nama kolom secara otomatis ---
-        df.columns = df.columns.str.strip()
-
-        # Bersihkan kolom index sisa export jika ada
-        if "Unnamed: 0" in df.columns:
-            df = df.drop(columns=["Unnamed: 0"])
-            
-        # --- PERUBAHAN: Selalu pastikan kolom harga dan jumlah adalah numerik ---
-        currency_cols = ['HARGARATA', 'TOTALHARGA']
-        for col in currency_cols:
-            if col in df.columns:
-                cleaned_val = df[col].astype(str).str.replace(r'[^\d.]', '', regex=True)
-                df[col] = pd.to_numeric(cleaned_val, errors='coerce')
-        
-        # --- PERBAIKAN: Mengatasi error casting float ke int ---
-        int_cols = ['JUMLAH', 'JMLDISETUJUI', 'JML_DITERIMA']
-        for col in int_cols:
-            if col in df.columns:
-                # Mengisi NaN dengan 0 dan membulatkan sebelum mengubah ke integer
-                numeric_vals = pd.to_numeric(df[col], errors='coerce').fillna(0)
-                df[col] = numeric_vals.round().astype(int)
-
-        if 'SJ_CREATED_ON' in df.columns:
-            df['SJ_CREATED_ON'] = pd.to_datetime(df['SJ_CREATED_ON'], errors='coerce')
-            
-        return df
+        with stage("load_pairs") as load:
+            if PAIRS_PATH and Path(PAIRS_PATH).exists():
+                # `mtime` file hasil `pairgen.py` menjadi revisinya
+                path, revision = PAIRS_PATH, f"parquet:{Path(PAIRS_PATH).stat().st_mtime}"
+            else:
+                path, revision = snapshot_for("pairs", FILE_ID_DB, SHEET_NAME_DB)
+            with cache_probe("get_pairs_data"):
+                pairs = get_pairs_data(revision, path)
+            load.rows = len(pairs.df)
+        return pairs
+    except Exception as e:
+        st.error(f"Gagal memuat database kemiripan (fileId={FILE_ID_DB}): {e}")
+        return None
+
+def load_sj_data() -> Optional[SjData]:
+    """Data SJ untuk rerun ini; None (dengan pesan error) jika gagal dimuat."""
+    try:
+        with stage("load_sj") as load:
+            incremental = REFRESHER is not None and REFRESHER.ready
+            if incremental:
+                path, revision = str(REFRESHER.sj_dir), REFRESHER.revision()
+            else:
+                path, revision = snapshot_for("sj", FILE_ID_SJ, SHEET_NAME_SJ)
+            with cache_probe("get_sj_data"):
+                sj = get_sj_data(revision, path, incremental=incremental)
+            load.rows = len(sj.backend)
+        return sj
     except Exception as e:
-        st.error(f"Gagal memuat Excel dari Drive (fileId={file_id}): {e}")
-        return pd.DataFrame()
-
-# --- Fungsi untuk menyorot perbedaan teks ---
-def highlight_diff(text1, text2):
-    sm = difflib.SequenceMatcher(None, str(text1), str(text2))
-    output1, output2 = "", ""
-    style_del = 'style="background-color: #ffcdd2; padding: 2px; border-radius: 3px;"'
-    style_ins = 'style="background-color: #c8e6c9; padding: 2px; border-radius: 3px;"'
-
-    for opcode, i1, i2, j1, j2 in sm.get_opcodes():
-        if opcode == 'equal':
-            output1 += text1[i1:i2]
-            output2 += text2[j1:j2]
-        elif opcode == 'replace':
-            output1 += f'<span {style_del}>{text1[i1:i2]}</span>'
-            output2 += f'<span {style_ins}>{text2[j1:j2]}</span>'
-        elif opcode == 'delete':
-            output1 += f'<span {style_del}>{text1[i1:i2]}</span>'
-        elif opcode == 'insert':
-            output2 += f'<span {style_ins}>{text2[j1:j2]}</span>'
-
-    return output1, output2
+        st.error(f"Gagal memuat Data SJ (fileId={FILE_ID_SJ}): {e}")
+        return None
+
+# --- Prefetch latar belakang: download & parse paralel saat start, refresh sebelum TTL habis ---
+def warm_shared_data(kind: str, path: Path, revision: str) -> None:
+    """Bangun data dan indeks bersama untuk revisi baru sebelum revisi itu dipakai request pengguna."""
+    if kind == "pairs":
+        get_pairs_data(revision, str(path))
+    else:
+        # Argumen sama persis dengan `load_sj_data`: kunci cache Streamlit tidak mengisi nilai default
+        get_sj_data(revision, str(path), incremental=False).price_stats(today())
+
+@st.cache_resource
+def get_prefetcher() -> Prefetcher:
+    """Satu prefetcher per proses; tanpa sumber (nonaktif) jika `PREFETCH_INTERVAL` 0.
+
+    Jika resource ini dibuang dan dibuat ulang, `activate` menghentikan thread prefetcher lama.
+    """
+    sources = {}
+    if PREFETCH_INTERVAL > 0:
+        if not (PAIRS_PATH and Path(PAIRS_PATH).exists()):
+            sources["pairs"] = (FILE_ID_DB, SHEET_NAME_DB)
+        if not (REFRESHER is not None and REFRESHER.ready):
+            sources["sj"] = (FILE_ID_SJ, SHEET_NAME_SJ)
+    # Fungsi cache dipanggil dari thread prefetch (tanpa sesi); peringatan "missing ScriptRunContext" tidak relevan
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        lambda record: not threading.current_thread().name.startswith("drive-prefetch")
+    )
+    return activate(Prefetcher(get_snapshot_store(), sources, interval=PREFETCH_INTERVAL,
+                               on_update=warm_shared_data))
+
+get_prefetcher()
+
+def section(func):
+    """Bagian dashboard sebagai `st.fragment`: interaksi widget di dalamnya hanya menjalankan ulang bagian ini.
+
+    Saat dijalankan sendiri (bukan bagian dari rerun penuh), bagian ini mencatat trace
+    instrumentasinya sendiri dengan scope nama fungsi.
+    """
+    @st.fragment
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        if active_trace() is not None:
+            return func(*args, **kwargs)
+        trace = start_run(st.session_state.diag_session, track_memory=st.session_state.get('diag_track_memory', False),
+                          scope=func.__name__)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            trace.log_summary()
+            st.session_state.diag_fragment_trace = trace
+    return run
 
 # --- Inisialisasi Session State ---
-if 'filtered_df' not in st.session_state:
-    st.session_state.filtered_df = None
+if 'filtered_table' not in st.session_state:
+    st.session_state.filtered_table = None
 if 'new_item_results' not in st.session_state:
     st.session_state.new_item_results = None
+if 'bulk_results' not in st.session_state:
+    st.session_state.bulk_results = None
 
 # --- Memuat Database (Excel/Sheet privat) ---
-db_df = load_excel_from_drive(FILE_ID_DB, sheet_name=SHEET_NAME_DB)
-
-if not db_df.empty:
-    # Membersihkan nama kolom untuk kemudahan akses
-    db_df.columns = (
-        db_df.columns.astype(str).str.strip()
-        .str.replace(' (%)', '_PERSEN', regex=False)
-        .str.replace(' ', '_')
-    )
-    # Pastikan kolom numerik dalam tipe numeric
-    if 'SCORE' in db_df.columns:
-        db_df['SCORE'] = pd.to_numeric(db_df['SCORE'], errors='coerce')
-    if 'SELISIH_HARGA_PERSEN' in db_df.columns:
-        db_df['SELISIH_HARGA_PERSEN'] = pd.to_numeric(db_df['SELISIH_HARGA_PERSEN'], errors='coerce')
-    # Buang baris tanpa nilai numerik penting
-    drop_cols = [c for c in ['SCORE', 'SELISIH_HARGA_PERSEN'] if c in db_df.columns]
-    if drop_cols:
-        db_df.dropna(subset=drop_cols, inplace=True)
-else:
+pairs = load_pairs_data()
+
+if pairs is None or pairs.empty:
     st.error("Database utama tidak dapat dimuat dari Drive. Aplikasi tidak dapat berjalan.")
 
 # --- Sidebar Filters ---
 st.sidebar.header("🔍 Filter Data")
-if not db_df.empty:
+if pairs is not None and not pairs.empty:
     score_filter_option = st.sidebar.selectbox(
         "Filter Kemiripan SCORE:",
-        ('Tampilkan Semua (>= 90%)', 'Hampir Identik (>= 95%)', 'Sangat Mirip (Skor 100)')
+        tuple(SCORE_FILTERS)
     )
 
-    # KATEGORI_A/B bisa tidak ada jika struktur berbeda — handle aman
-    if all(col in db_df.columns for col in ['KATEGORI_A', 'KATEGORI_B']):
-        all_categories = sorted(pd.concat([db_df['KATEGORI_A'], db_df['KATEGORI_B']]).dropna().unique())
-    else:
-        all_categories = []
-
     selected_categories = st.sidebar.multiselect(
         "Filter berdasarkan Kategori",
-        options=all_categories,
+        options=pairs.categories,
         default=[]
     )
 
     if st.sidebar.button("START"):
         if not selected_categories:
             st.sidebar.warning("Mohon pilih setidaknya satu kategori.")
-            st.session_state.filtered_df = pd.DataFrame(columns=db_df.columns)
+            st.session_state.filtered_table = pairs.filter_table([], score_filter_option)
         else:
-            if score_filter_option == 'Tampilkan Semua (>= 90%)':
-                score_condition = (db_df['SCORE'] >= 90)
-            elif score_filter_option == 'Hampir Identik (>= 95%)':
-                score_condition = (db_df['SCORE'] >= 95)
-            else:  # Sangat Mirip (Skor 100)
-                score_condition = (db_df['SCORE'] == 100)
-
-            if len(selected_categories) == 1:
-                category_filter = (db_df['KATEGORI_A'] == selected_categories[0]) & (db_df['KATEGORI_B'] == selected_categories[0])
-            else:
-                category_filter = (db_df['KATEGORI_A'].isin(selected_categories)) & (db_df['KATEGORI_B'].isin(selected_categories))
-
-            filtered_df = db_df[
-                score_condition &
-                category_filter
-            ]
-
-            # Default sort order
-            filtered_df = filtered_df.sort_values(by="SCORE", ascending=False).reset_index(drop=True)
-            st.session_state.filtered_df = filtered_df
+            with stage("sidebar_filter") as timed:
+                # Hasil sudah terurut SCORE menurun (urutan default) dari PairFilter
+                st.session_state.filtered_table = pairs.filter_table(selected_categories, score_filter_option)
+                timed.rows = st.session_state.filtered_table.num_rows
+        st.session_state.page_number = 1
 
 # --- Fitur Cek Barang Baru ---
 st.sidebar.markdown("---")
@@ -210,82 +263,80 @@ if st.sidebar.button("Cek Kemiripan"):
         st.sidebar.warning("Nama barang tidak boleh kosong.")
     else:
         with st.spinner("Memuat data master SJ dan mencari kemiripan..."):
-            sj_df = load_excel_from_drive(FILE_ID_SJ, sheet_name=SHEET_NAME_SJ)
-
-            if not sj_df.empty and 'NAMABRG' in sj_df.columns and 'SJ_CREATED_ON' in sj_df.columns:
-                
-                sj_df_sorted = sj_df.sort_values(by='SJ_CREATED_ON', ascending=False)
-                master_list_df = sj_df_sorted.groupby(['NAMABRG', 'KODEBARANG', 'SATUAN']).agg(
-                    HARGARATA=('HARGARATA', 'first'),
-                    KATEGORI=('KATEGORI', 'first'),
-                    Permintaan_Terakhir=('SJ_CREATED_ON', 'max'),
-                    Permintaan_Awal=('SJ_CREATED_ON', 'min')
-                ).reset_index()
-
-                choices = master_list_df['NAMABRG'].tolist()
-                query_name = new_item_name.upper()
-
-                initial_matches = process.extract(query_name, choices, scorer=fuzz.ratio, limit=10, score_cutoff=50)
-
-                match_results = []
-                processed_items = set()
-
-                initial_names = {match[0] for match in initial_matches}
-                names_to_process_queue = list(initial_names)
-
-                while names_to_process_queue:
-                    current_name = names_to_process_queue.pop(0)
-
-                    variations = master_list_df[master_list_df['NAMABRG'] == current_name]
-
-                    for _, detail_row in variations.iterrows():
-                        item_tuple = (detail_row['NAMABRG'], detail_row['KODEBARANG'], detail_row['SATUAN'])
-                        if item_tuple in processed_items:
-                            continue
-                        processed_items.add(item_tuple)
-
-                        score = fuzz.ratio(query_name, detail_row['NAMABRG'])
-                        match_results.append({
-                            "Barang Mirip di Data SJ": detail_row['NAMABRG'],
-                            "Skor Kemiripan (%)": score,
-                            "Harga Rata-Rata": detail_row.get(f"HARGARATA", 0),
-                            "Kode": detail_row.get("KODEBARANG", "N/A"),
-                            "Kategori": detail_row.get("KATEGORI", "N_A"),
-                            "Satuan": detail_row.get("SATUAN", "N_A"),
-                            "Permintaan Awal": detail_row.get("Permintaan_Awal", pd.NaT),
-                            "Permintaan Terakhir": detail_row.get("Permintaan_Terakhir", pd.NaT)
-                        })
-
-                    if not db_df.empty and all(c in db_df.columns for c in ['BARANG_A', 'BARANG_B']):
-                        related_a = db_df[db_df['BARANG_A'] == current_name]['BARANG_B'].tolist()
-                        related_b = db_df[db_df['BARANG_B'] == current_name]['BARANG_A'].tolist()
-                        all_related = set(related_a + related_b)
-                        for related_name in all_related:
-                            if not any(related_name in item for item in processed_items):
-                                names_to_process_queue.append(related_name)
-
-                if match_results:
-                    results_df = pd.DataFrame(match_results).drop_duplicates(subset=['Barang Mirip di Data SJ', 'Kode', 'Satuan'])
-                    results_df = results_df.sort_values(by="Skor Kemiripan (%)", ascending=False)
-                    st.session_state.new_item_results = results_df
-                else:
-                    st.session_state.new_item_results = pd.DataFrame()
+            sj = load_sj_data()
+
+            if sj is not None and sj.master is not None:
+                with stage("cek_kemiripan") as timed:
+                    # Nama awal dari fuzzy match, lalu diperluas ke seluruh komponen terhubung di database kemiripan
+                    graph = pairs.graph if pairs is not None else None
+                    st.session_state.new_item_results = sj.check_name(new_item_name, graph, today())
+                    timed.rows = len(st.session_state.new_item_results)
             else:
                 st.sidebar.error("Gagal memuat atau memproses Data SJ. Pastikan kolom 'NAMABRG' dan 'SJ_CREATED_ON' ada.")
                 st.session_state.new_item_results = None
 
+# --- Cek massal: daftar nama barang dari file upload ---
+with st.sidebar.expander("📄 Cek Massal (Upload CSV/XLSX)"):
+    st.write("Upload daftar nama barang (kolom `NAMABRG`/`Nama Barang`, atau kolom pertama; boleh tanpa header). "
+             "Semua nama dicek sekaligus terhadap master list Data SJ.")
+    uploaded_names = st.file_uploader("File daftar nama barang", type=["csv", "xlsx"], key="bulk_upload")
+    bulk_top_k = st.number_input("Hasil teratas per nama:", min_value=1, max_value=50, value=5, step=1)
+    if st.button("Cek Massal"):
+        if uploaded_names is None:
+            st.warning("Upload file daftar nama barang terlebih dahulu.")
+        else:
+            with st.spinner("Mencocokkan semua nama dengan master list..."):
+                try:
+                    bulk_names = read_name_list(uploaded_names, uploaded_names.name)
+                except Exception as e:
+                    st.error(f"Gagal membaca file {uploaded_names.name}: {e}")
+                    bulk_names = []
+                sj = load_sj_data() if bulk_names else None
+
+                if sj is not None and sj.master is not None:
+                    with stage("cek_massal") as timed:
+                        graph = pairs.graph if pairs is not None else None
+                        st.session_state.bulk_results = sj.check_names(bulk_names, graph, today(), int(bulk_top_k))
+                        timed.rows = len(bulk_names)
+                elif bulk_names:
+                    st.error("Gagal memuat atau memproses Data SJ. Pastikan kolom 'NAMABRG' dan 'SJ_CREATED_ON' ada.")
+                else:
+                    st.warning("Tidak ada nama barang yang terbaca dari file.")
+
+# --- Pemakaian memori data bersama ---
+@section
+def memory_section():
+    with st.expander("💾 Memori Data Bersama"):
+        if st.checkbox("Tampilkan pemakaian memori", key="show_memory_report"):
+            pairs = load_pairs_data()
+            shared_frames = {"Database Kemiripan": pairs.df} if pairs is not None else {}
+            if SJ_BACKEND == "pandas":
+                sj = load_sj_data()
+                if sj is not None:
+                    shared_frames["Data SJ"] = sj.backend.df
+            report = memory_report(shared_frames)
+            st.write(f"Total: **{report['MB'].sum():,.1f} MB** (satu salinan untuk semua sesi)")
+            st.dataframe(report.style.format({'MB': '{:,.2f}'}), hide_index=True)
+
+with st.sidebar:
+    memory_section()
+
+# Panel diagnostik diisi di akhir skrip, setelah semua tahap rerun ini tercatat
+diagnostics_slot = st.sidebar.container()
+
 # --- Menampilkan hasil HANYA jika sudah difilter ---
-if st.session_state.filtered_df is not None:
-    filtered_df = st.session_state.filtered_df
+@section
+def results_section():
+    filtered_table = st.session_state.filtered_table
     st.markdown("---")
     st.header("📋 Hasil Filter")
 
-    if not filtered_df.empty:
-        col1, col2 = st.columns(2)
+    if filtered_table.num_rows > 0:
+        col1, col2, col3 = st.columns(3)
         with col1:
-            display_limit_option = st.selectbox(
-                "Tampilkan jumlah pasangan:",
-                ('100 Teratas', '200 Teratas', 'Seluruh Pasangan'),
+            page_size = st.selectbox(
+                "Jumlah pasangan per halaman:",
+                (100, 200, 500, 1000),
                 key='display_limit'
             )
         with col2:
@@ -295,167 +346,155 @@ if st.session_state.filtered_df is not None:
                 key='sort_order'
             )
 
+        total_rows = filtered_table.num_rows
+        n_pages = page_count(total_rows, page_size)
+        # Jaga nomor halaman tetap valid saat ukuran halaman atau hasil filter berubah
+        if st.session_state.get('page_number', 1) > n_pages:
+            st.session_state.page_number = n_pages
+        with col3:
+            page_number = st.number_input(
+                "Halaman:", min_value=1, max_value=n_pages, step=1, key='page_number'
+            )
+
+        # Tabel sudah terurut menurun; urutan naik dibaca dari belakang tanpa sort ulang
         sort_ascending = (sort_order_option == 'Terkecil ke Tertinggi')
-        sorted_df = filtered_df.sort_values(by="SCORE", ascending=sort_ascending)
-
-        if display_limit_option == '100 Teratas':
-            display_df_limited = sorted_df.head(100)
-            st.write(f"Menampilkan **{len(display_df_limited)} dari {len(sorted_df)}** total pasangan yang cocok.")
-        elif display_limit_option == '200 Teratas':
-            display_df_limited = sorted_df.head(200)
-            st.write(f"Menampilkan **{len(display_df_limited)} dari {len(sorted_df)}** total pasangan yang cocok.")
-        else:
-            display_df_limited = sorted_df
-            st.warning("Perhatian: Menampilkan seluruh pasangan (jika ribuan) dapat memperlambat aplikasi.")
-            st.write(f"Menampilkan **{len(display_df_limited)}** total pasangan yang cocok.")
-
-        display_df = display_df_limited[[
-            c for c in [
-                "SCORE", "SELISIH_HARGA_PERSEN", "BARANG_A", "HARGA_A", "SATUAN", "KODE_A", "KATEGORI_A",
-                "BARANG_B", "HARGA_B", "KODE_B", "KATEGORI_B"
-            ] if c in sorted_df.columns
-        ]]
-
-        styled_df = display_df.style.format({
-            'HARGA_A': "Rp {:,.0f}",
-            'HARGA_B': "Rp {:,.0f}",
-            'SCORE': '{:.2f}',
-            'SELISIH_HARGA_PERSEN': '{:.2f}%'
-        }).set_properties(
-            **{'background-color': '#e8f5e9'},
-            subset=[c for c in ["BARANG_A", "BARANG_B"] if c in display_df.columns]
-        ).set_properties(
-            **{'background-color': "#e3f2fd"},
-            subset=[c for c in ["HARGA_A", "HARGA_B"] if c in display_df.columns]
-        )
+        page_table = page_slice(filtered_table, page_size, page_number, reverse=sort_ascending)
+        start, stop = page_bounds(total_rows, page_size, page_number)
+        st.write(f"Menampilkan **{start + 1}–{stop} dari {total_rows}** total pasangan yang cocok (halaman {page_number} dari {n_pages}).")
+
+        with stage("render_table", rows=page_table.num_rows):
+            # Format angka hanya untuk baris di halaman ini
+            display_df = format_columns(page_table.to_pandas(), PAIR_FORMATS)
+            styled_df = display_df.style.set_properties(
+                **{'background-color': '#e8f5e9'},
+                subset=[c for c in ["BARANG_A", "BARANG_B"] if c in display_df.columns]
+            ).set_properties(
+                **{'background-color': "#e3f2fd"},
+                subset=[c for c in ["HARGA_A", "HARGA_B"] if c in display_df.columns]
+            )
 
-        st.dataframe(styled_df)
+            st.dataframe(styled_df, hide_index=True)
     else:
         st.warning("Tidak ada data yang cocok dengan filter Anda.")
+
+if st.session_state.filtered_table is not None:
+    results_section()
 else:
     st.info("Pilih filter di sidebar dan klik 'START' untuk memulai.")
 
 # --- Bagian Analisis Detail ---
-st.markdown("---")
-st.header("🔬 Analisis Detail Barang")
-primary_item = st.text_input("Masukkan nama barang untuk dianalisis:", key="detail_search")
-
-if primary_item:
-    tab1, tab2 = st.tabs(["Perbandingan Side-by-Side", "Tinjau Data SJ"])
-
-    with tab1:
-        st.subheader(f"Mencari pasangan mirip untuk: {primary_item}")
-        if not db_df.empty and all(c in db_df.columns for c in ['BARANG_A', 'BARANG_B', 'HARGA_A', 'HARGA_B', 'SATUAN', 'KODE_A', 'KODE_B', 'KATEGORI_A', 'KATEGORI_B']):
-            related_pairs = db_df[
-                (db_df['BARANG_A'].str.contains(primary_item, case=False, na=False)) |
-                (db_df['BARANG_B'].str.contains(primary_item, case=False, na=False))
-            ]
-        else:
-            related_pairs = pd.DataFrame()
-
-        if not related_pairs.empty:
-            st.write(f"Ditemukan {len(related_pairs)} pasangan yang mirip di dalam database:")
-            for _, row in related_pairs.iterrows():
-                is_a_primary = primary_item.upper() in str(row['BARANG_A']).upper()
-
-                item_a_name = row['BARANG_A'] if is_a_primary else row['BARANG_B']
-                item_a_price = row['HARGA_A'] if is_a_primary else row['HARGA_B']
-                item_a_unit = row['SATUAN']
-                item_a_code = row['KODE_A'] if is_a_primary else row['KODE_B']
-                item_a_cat = row['KATEGORI_A'] if is_a_primary else row['KATEGORI_B']
-
-                item_b_name = row['BARANG_B'] if is_a_primary else row['BARANG_A']
-                item_b_price = row['HARGA_B'] if is_a_primary else row['HARGA_A']
-                item_b_unit = row['SATUAN']
-                item_b_code = row['KODE_B'] if is_a_primary else row['KODE_A']
-                item_b_cat = row['KATEGORI_B'] if is_a_primary else row['KATEGORI_A']
-
-                highlighted_a, highlighted_b = highlight_diff(item_a_name, item_b_name)
-
-                st.markdown("---")
-                col1_tab1, col2_tab1 = st.columns(2)
-                with col1_tab1:
-                    st.markdown("#### Barang Utama")
-                    st.markdown(f"**Nama:** {highlighted_a}", unsafe_allow_html=True)
-                    if pd.notna(item_a_price):
-                        st.markdown(f"**Harga:** Rp {int(item_a_price):,}".replace(',', '.'))
-                    st.markdown(f"**Satuan:** {item_a_unit}")
-                    st.markdown(f"**Kode:** {item_a_code}")
-                    st.markdown(f"**Kategori:** {item_a_cat}")
-
-                with col2_tab1:
-                    st.markdown("#### Pasangan Mirip")
-                    st.markdown(f"**Nama:** {highlighted_b}", unsafe_allow_html=True)
-                    if pd.notna(item_b_price):
-                        st.markdown(f"**Harga:** Rp {int(item_b_price):,}".replace(',', '.'))
-                    st.markdown(f"**Satuan:** {item_b_unit}")
-                    st.markdown(f"**Kode:** {item_b_code}")
-                    st.markdown(f"**Kategori:** {item_b_cat}")
-        else:
-            st.info("Tidak ditemukan pasangan yang mirip di dalam database kemiripan.")
-
-    with tab2:
-        st.subheader(f"Mencari riwayat pembelian untuk: {primary_item}")
-        
-        # --- PEMBARUAN: Tambahkan filter waktu di sini ---
-        time_filter_option = st.selectbox(
-            "Filter riwayat berdasarkan waktu:",
-            ('Tampilkan Semua', '3 Bulan Terakhir', '6 Bulan Terakhir', '1 Tahun Terakhir'),
-            key='time_filter'
+@section
+def compare_tab(primary_item: str):
+    st.subheader(f"Mencari pasangan mirip untuk: {primary_item}")
+    pairs = load_pairs_data()
+    if pairs is not None:
+        with stage("detail_search") as timed:
+            related_positions = pairs.related_positions(primary_item)
+            timed.rows = len(related_positions)
+    else:
+        related_positions = np.empty(0, dtype=np.int64)
+
+    if len(related_positions) > 0:
+        st.write(f"Ditemukan {len(related_positions)} pasangan yang mirip di dalam database:")
+
+        n_pages = page_count(len(related_positions), COMPARE_PAGE_SIZE)
+        # Kembali ke halaman pertama setiap kali kata kunci berubah
+        if st.session_state.get('compare_query') != primary_item or st.session_state.get('compare_page', 1) > n_pages:
+            st.session_state.compare_query = primary_item
+            st.session_state.compare_page = 1
+        compare_page = st.number_input(
+            "Halaman perbandingan:", min_value=1, max_value=n_pages, step=1, key='compare_page'
         )
 
-        include_similar = st.checkbox("Sertakan semua barang yang mirip dalam pencarian riwayat (Skor >= 95%)")
-
-        with st.spinner("Memuat data riwayat pembelian..."):
-            sj_df = load_excel_from_drive(FILE_ID_SJ, sheet_name=SHEET_NAME_SJ)
-
-        if not sj_df.empty and 'NAMABRG' in sj_df.columns:
-            search_terms = [primary_item]
-            if include_similar and not db_df.empty and all(c in db_df.columns for c in ['BARANG_A', 'BARANG_B', 'SCORE']):
-                related_pairs_for_sj = db_df[
-                    (db_df['BARANG_A'].str.contains(primary_item, case=False, na=False)) |
-                    (db_df['BARANG_B'].str.contains(primary_item, case=False, na=False))
-                ]
-                high_score_pairs = related_pairs_for_sj[related_pairs_for_sj['SCORE'] >= 95]
-
-                if not high_score_pairs.empty:
-                    similar_items_a = high_score_pairs['BARANG_A'].tolist()
-                    similar_items_b = high_score_pairs['BARANG_B'].tolist()
-                    search_terms = list(set([primary_item] + similar_items_a + similar_items_b))
-
-            search_pattern = '|'.join([re.escape(term) for term in search_terms])
-            sj_filtered_by_name = sj_df[sj_df['NAMABRG'].str.contains(search_pattern, case=False, na=False, regex=True)]
-
-            # --- PEMBARUAN: Terapkan filter waktu ---
-            sj_final_filtered = sj_filtered_by_name
-            if time_filter_option != 'Tampilkan Semua':
-                today = pd.Timestamp.now()
-                if time_filter_option == '3 Bulan Terakhir':
-                    cutoff_date = today - pd.DateOffset(months=3)
-                elif time_filter_option == '6 Bulan Terakhir':
-                    cutoff_date = today - pd.DateOffset(months=6)
-                elif time_filter_option == '1 Tahun Terakhir':
-                    cutoff_date = today - pd.DateOffset(years=1)
-                
-                if 'SJ_CREATED_ON' in sj_final_filtered.columns:
-                    sj_final_filtered = sj_final_filtered[sj_final_filtered['SJ_CREATED_ON'] >= cutoff_date]
-
-            if not sj_final_filtered.empty:
-                st.write(f"Ditemukan {len(sj_final_filtered)} riwayat pembelian yang cocok:")
-                format_dict = {
-                    'HARGARATA': 'Rp {:,.0f}',
-                    'TOTALHARGA': 'Rp {:,.0f}',
-                    'SJ_CREATED_ON': '{:%d/%m/%y}',
-                    'JUMLAH': '{:,.0f}',
-                    'JMLDISETUJUI': '{:,.0f}',
-                    'JML_DITERIMA': '{:,.0f}'
-                }
-                final_format_dict = {k: v for k, v in format_dict.items() if k in sj_final_filtered.columns}
+        # Kartu hanya dibangun untuk pasangan di halaman ini, lalu dikirim sebagai satu blok HTML
+        start, stop = page_bounds(len(related_positions), COMPARE_PAGE_SIZE, compare_page)
+        page_pairs = pairs.df.iloc[related_positions[start:stop]]
+        st.caption(f"Menampilkan pasangan {start + 1}–{stop} (halaman {compare_page} dari {n_pages}).")
+        with stage("render_compare", rows=len(page_pairs)):
+            st.markdown(render_comparison_cards(page_pairs, primary_item), unsafe_allow_html=True)
+    else:
+        st.info("Tidak ditemukan pasangan yang mirip di dalam database kemiripan.")
+
+@section
+def history_tab(primary_item: str):
+    st.subheader(f"Mencari riwayat pembelian untuk: {primary_item}")
+
+    # --- PEMBARUAN: Tambahkan filter waktu di sini ---
+    time_filter_option = st.selectbox(
+        "Filter riwayat berdasarkan waktu:",
+        tuple(TIME_WINDOWS),
+        key='time_filter'
+    )
+
+    include_similar = st.checkbox("Sertakan semua barang yang mirip dalam pencarian riwayat (Skor >= 95%)")
+
+    with st.spinner("Memuat data riwayat pembelian..."):
+        sj = load_sj_data()
+
+    if sj is not None:
+        search_terms = [primary_item]
+        if include_similar:
+            pairs = load_pairs_data()
+            if pairs is not None:
+                search_terms = pairs.similar_terms(primary_item)
+
+        # Nama dicocokkan sekali ke daftar nama unik; filter nama & waktu (periode yang sama dengan
+        # tabel statistik harga, dihitung dari awal hari ini) dijalankan oleh backend
+        day = today()
+        with stage("history") as timed:
+            sj_final_filtered = sj.history(search_terms, time_filter_option, day)
+            timed.rows = len(sj_final_filtered)
+
+        if not sj_final_filtered.empty:
+            # Konsistensi harga dibaca dari tabel statistik yang sudah dimaterialisasi, bukan dihitung ulang
+            item_stats, sj_final_filtered = sj.price_context(sj_final_filtered, time_filter_option, day)
+            if not item_stats.empty:
+                st.write(f"Statistik harga per barang ({time_filter_option}):")
+                st.dataframe(
+                    item_stats.style.format({
+                        **{c: 'Rp {:,.0f}' for c in item_stats.columns if c.startswith('HARGA_')},
+                        'JUMLAH_PERMINTAAN': '{:,.0f}',
+                        'PERMINTAAN_TERAKHIR': '{:%d/%m/%y}',
+                    }, na_rep=""),
+                    hide_index=True
+                )
+
+            n_anomalies = int(sj_final_filtered['ANOMALI_HARGA'].sum()) if 'ANOMALI_HARGA' in sj_final_filtered.columns else 0
+            if n_anomalies:
+                st.warning(f"{n_anomalies} riwayat dengan harga di luar rentang wajar barangnya "
+                           f"(Q1 - 1,5×IQR s.d. Q3 + 1,5×IQR) ditandai di kolom ANOMALI_HARGA.")
+
+            st.write(f"Ditemukan {len(sj_final_filtered)} riwayat pembelian yang cocok:")
+            format_dict = {
+                'HARGARATA': 'Rp {:,.0f}',
+                'TOTALHARGA': 'Rp {:,.0f}',
+                'SJ_CREATED_ON': '{:%d/%m/%y}',
+                'JUMLAH': '{:,.0f}',
+                'JMLDISETUJUI': '{:,.0f}',
+                'JML_DITERIMA': '{:,.0f}'
+            }
+            final_format_dict = {k: v for k, v in format_dict.items() if k in sj_final_filtered.columns}
+            with stage("render_history", rows=len(sj_final_filtered)):
                 st.dataframe(sj_final_filtered.style.format(final_format_dict))
-            else:
-                st.warning(f"Tidak ditemukan riwayat pembelian yang cocok di Data SJ.")
         else:
-            st.error("Gagal memuat atau memproses Data SJ.")
+            st.warning(f"Tidak ditemukan riwayat pembelian yang cocok di Data SJ.")
+    else:
+        st.error("Gagal memuat atau memproses Data SJ.")
+
+@section
+def detail_section():
+    st.markdown("---")
+    st.header("🔬 Analisis Detail Barang")
+    primary_item = st.text_input("Masukkan nama barang untuk dianalisis:", key="detail_search")
+
+    if primary_item:
+        tab1, tab2 = st.tabs(["Perbandingan Side-by-Side", "Tinjau Data SJ"])
+        with tab1:
+            compare_tab(primary_item)
+        with tab2:
+            history_tab(primary_item)
+
+detail_section()
 
 # --- Menampilkan Hasil Cek Barang Baru ---
 if st.session_state.new_item_results is not None:
@@ -473,6 +512,9 @@ if st.session_state.new_item_results is not None:
             "Kategori",
             "Satuan",
             "Harga Rata-Rata",
+            "Harga Median",
+            "Jumlah Permintaan",
+            "Harga Anomali",
             "Permintaan Awal",
             "Permintaan Terakhir"
         ]
@@ -482,6 +524,7 @@ if st.session_state.new_item_results is not None:
         st.dataframe(
             display_results_df.style.format({
                 'Harga Rata-Rata': 'Rp {:,.0f}',
+                'Harga Median': 'Rp {:,.0f}',
                 'Skor Kemiripan (%)': '{:.2f}',
                 'Permintaan Awal': '{:%d-%m-%Y}',
                 'Permintaan Terakhir': '{:%d-%m-%Y}'
@@ -490,4 +533,51 @@ if st.session_state.new_item_results is not None:
             hide_index=True
         )
     else:
-        st.success(f"Tidak ditemukan barang yang mirip dengan '{new_item_name}' (di atas 50%). Barang ini kemungkinan besar unik.")
\ No newline at end of file
+        st.success(f"Tidak ditemukan barang yang mirip dengan '{new_item_name}' (di atas 50%). Barang ini kemungkinan besar unik.")
+
+# --- Menampilkan Hasil Cek Massal ---
+if st.session_state.bulk_results is not None:
+    st.markdown("---")
+    st.header("📑 Hasil Cek Massal")
+    bulk_results = st.session_state.bulk_results
+    if not bulk_results.empty:
+        n_inputs = bulk_results['No'].nunique()
+        n_unmatched = bulk_results.groupby('No', sort=False)['Barang Mirip di Data SJ'].count().eq(0).sum()
+        st.write(f"{n_inputs} nama dicek; {n_unmatched} nama tanpa barang mirip (di atas 50%).")
+        st.dataframe(
+            bulk_results.style.format({
+                'Harga Rata-Rata': 'Rp {:,.0f}',
+                'Harga Median': 'Rp {:,.0f}',
+                'Skor Kemiripan (%)': '{:.2f}',
+                'Permintaan Awal': '{:%d-%m-%Y}',
+                'Permintaan Terakhir': '{:%d-%m-%Y}'
+            }, na_rep=""),
+            use_container_width=True,
+            hide_index=True
+        )
+        # Download tidak perlu menjalankan ulang app
+        st.download_button(
+            "⬇️ Download hasil (CSV)",
+            data=bulk_results.to_csv(index=False).encode("utf-8-sig"),
+            file_name="hasil_cek_massal.csv",
+            mime="text/csv",
+            on_click="ignore",
+        )
+    else:
+        st.warning("Tidak ada nama barang yang dicek.")
+
+# --- Panel Diagnostik (opt-in) ---
+RUN_TRACE.log_summary()
+with diagnostics_slot.expander("🩺 Diagnostik"):
+    st.checkbox("Ukur memori puncak per tahap (tracemalloc, lebih lambat)", key='diag_track_memory')
+    if st.checkbox("Tampilkan waktu per tahap", key='show_diagnostics'):
+        st.write(f"Rerun `{RUN_TRACE.run_id}`: **{RUN_TRACE.total_ms():,.0f} ms**")
+        st.dataframe(RUN_TRACE.stages_frame(), hide_index=True)
+        if RUN_TRACE.cache:
+            st.dataframe(RUN_TRACE.cache_frame(), hide_index=True)
+        # Rerun fragment (mis. ganti halaman atau filter waktu) tidak menjalankan panel ini; tampilkan yang terakhir
+        fragment_trace = st.session_state.get('diag_fragment_trace')
+        if fragment_trace is not None:
+            st.write(f"Rerun fragment terakhir `{fragment_trace.scope}` (`{fragment_trace.run_id}`): "
+                     f"**{fragment_trace.total_ms():,.0f} ms**")
+            st.dataframe(fragment_trace.stages_frame(), hide_index=True)
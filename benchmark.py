@@ -0,0 +1,193 @@
+"""Benchmark headless jalur utama dashboard dengan data sintetis.
+
+Membangkitkan database kemiripan dan Data SJ sintetis (nama barang berbahasa Indonesia
+beserta variasi penulisannya), menyajikannya lewat Drive lokal (`LocalDriveClient`), lalu
+mengukur waktu tiap tahap tanpa Streamlit:
+
+- `load_parse`: download + parsing Excel ke snapshot Parquet (snapshot dingin);
+- `shared_frames`: baca snapshot, normalisasi, dan pemadatan tipe (`core.load_frame`);
+- `build_indexes`: `core.PairsData` (filter, graf, kategori) dan `core.SjData` (backend SJ + master list);
+- `price_stats`: tabel statistik harga per KODEBARANG/SATUAN untuk semua periode;
+- `sidebar_filter`: filter START (kategori + opsi skor) sampai tabel Arrow;
+- `cek_kemiripan`: fuzzy match master list + perluasan lewat graf, dengan konteks harga;
+- `detail_search`: pencarian substring pasangan di tab perbandingan;
+- `history`: riwayat pembelian (dengan filter waktu) beserta statistik dan penanda anomali harga;
+- `render_prep`: potongan halaman + format kolom tabel dan HTML kartu perbandingan.
+
+Hasil ditulis sebagai JSON agar bisa dibandingkan antar commit.
+
+Contoh:
+    python benchmark.py --pairs 100000 --sj-rows 1000000 --out .cache/bench/result.json
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core import SCORE_FILTERS, PairsData, SjData, load_frame, today
+from data_source import LocalDriveClient, SnapshotStore, clean_frame
+from sj_backend import DuckDbSjBackend, PandasSjBackend
+from synthetic import sample_queries, synthetic_items, synthetic_pairs, synthetic_sj, write_xlsx
+from table_view import PAIR_FORMATS, format_columns, page_slice, render_comparison_cards
+
+try:
+    import resource  # hanya ada di POSIX
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# File id sintetis untuk Drive lokal
+FILE_ID_DB = "bench_db"
+FILE_ID_SJ = "bench_sj"
+
+# --- Pengukuran ---
+class StageTimer:
+    """Kumpulan waktu per tahap; tiap tahap bisa berisi beberapa panggilan (mis. beberapa query)."""
+
+    def __init__(self):
+        self.stages: Dict[str, dict] = {}
+
+    def run(self, stage: str, func: Callable, *args, rows: Optional[Callable] = None, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        entry = self.stages.setdefault(stage, {"calls_ms": [], "rows": 0})
+        entry["calls_ms"].append(elapsed * 1000)
+        if rows is not None:
+            entry["rows"] += int(rows(result))
+        return result
+
+    def summary(self) -> Dict[str, dict]:
+        out = {}
+        for stage, entry in self.stages.items():
+            calls = entry["calls_ms"]
+            out[stage] = {
+                "calls": len(calls),
+                "total_ms": round(sum(calls), 3),
+                "median_ms": round(statistics.median(calls), 3),
+                "max_ms": round(max(calls), 3),
+                "rows": entry["rows"],
+            }
+        return out
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Puncak RSS proses (MB); None jika modul `resource` tidak tersedia (mis. Windows)."""
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_benchmark(work_dir, n_pairs: int, n_sj_rows: int, n_names: Optional[int] = None,
+                  n_queries: int = 20, backend: str = "pandas", xlsx_max_rows: int = 200_000,
+                  seed: int = 0) -> dict:
+    work_dir = Path(work_dir)
+    drive_dir, snapshot_dir = work_dir / "drive", work_dir / "snapshots"
+    drive_dir.mkdir(parents=True, exist_ok=True)
+    n_names = n_names or max(1_000, n_sj_rows // 50)
+
+    started = time.perf_counter()
+    items = synthetic_items(n_names, seed)
+    sj = synthetic_sj(items, n_sj_rows, seed + 1)
+    pairs = synthetic_pairs(items, n_pairs, seed + 2)
+    generate_seconds = time.perf_counter() - started
+
+    timer = StageTimer()
+    store = SnapshotStore(LocalDriveClient(drive_dir), snapshot_dir)
+    snapshots = {}
+    for file_id, df in ((FILE_ID_DB, pairs), (FILE_ID_SJ, sj)):
+        for stale in list(drive_dir.glob(f"{file_id}.*")) + list(snapshot_dir.glob(f"{file_id}__*")):
+            stale.unlink()
+        if len(df) <= xlsx_max_rows:
+            write_xlsx(df, drive_dir / f"{file_id}.xlsx")
+            snapshots[file_id] = timer.run("load_parse", store.ensure, file_id, rows=lambda _, n=len(df): n)
+        else:
+            # Excel sebesar ini tidak realistis untuk ditulis; snapshot Parquet dibuat langsung (snapshot hangat)
+            logger.info("%s: %d baris > --xlsx-max-rows, parsing Excel dilewati", file_id, len(df))
+            revision = f"bench:{seed}:{len(df)}"
+            snapshots[file_id] = (store.put(file_id, clean_frame(df.copy()), revision), revision)
+
+    db_path, db_revision = snapshots[FILE_ID_DB]
+    sj_path, sj_revision = snapshots[FILE_ID_SJ]
+    db_df = timer.run("shared_frames", load_frame, str(db_path), db_revision, "pairs", rows=len)
+    if backend == "duckdb":
+        sj_backend = timer.run("build_indexes", DuckDbSjBackend, sj_path, sj_revision, work_dir / "duckdb")
+    else:
+        sj_df = timer.run("shared_frames", load_frame, str(sj_path), sj_revision, "sj", rows=len)
+        sj_backend = timer.run("build_indexes", PandasSjBackend, sj_df, sj_revision)
+
+    pairs_data = timer.run("build_indexes", PairsData, db_df)
+    sj_data = timer.run("build_indexes", SjData, sj_backend)
+    day = today()
+    timer.run("price_stats", sj_data.price_stats, day, rows=len)
+
+    score_options = list(SCORE_FILTERS)
+    categories = pairs_data.categories
+    for i in range(n_queries):
+        selected = categories[: 1 + i % len(categories)]
+        timer.run("sidebar_filter", pairs_data.filter_table, selected, score_options[i % len(score_options)],
+                  rows=lambda table: table.num_rows)
+
+    period = '6 Bulan Terakhir'
+    table = pairs_data.filter_table(categories, score_options[0])
+    for query in sample_queries(items, n_queries, seed + 3):
+        timer.run("cek_kemiripan", sj_data.check_name, query, pairs_data.graph, day, rows=len)
+        positions = timer.run("detail_search", pairs_data.related_positions, query, rows=len)
+        timer.run("history", lambda: sj_data.price_context(sj_data.history([query], period, day), period, day)[1],
+                  rows=len)
+        timer.run("render_prep", lambda: (
+            format_columns(page_slice(table, 100, 1).to_pandas(), PAIR_FORMATS),
+            render_comparison_cards(db_df.iloc[positions[:20]], query),
+        ))
+
+    return {
+        "config": {
+            "pairs": n_pairs, "sj_rows": n_sj_rows, "names": n_names, "queries": n_queries,
+            "backend": backend, "xlsx_max_rows": xlsx_max_rows, "seed": seed,
+        },
+        "environment": {
+            "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "machine": platform.machine(), "generated_at": pd.Timestamp.now().isoformat(timespec="seconds"),
+        },
+        "generate_seconds": round(generate_seconds, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": timer.summary(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark headless dashboard dengan data sintetis.")
+    parser.add_argument("--pairs", type=int, default=100_000, help="Jumlah baris database kemiripan (default 100000)")
+    parser.add_argument("--sj-rows", type=int, default=200_000, help="Jumlah baris Data SJ (default 200000)")
+    parser.add_argument("--names", type=int, default=None, help="Jumlah nama barang unik (default sj-rows/50, min 1000)")
+    parser.add_argument("--queries", type=int, default=20, help="Jumlah query per tahap interaktif (default 20)")
+    parser.add_argument("--backend", choices=("pandas", "duckdb"), default="pandas", help="Backend Data SJ")
+    parser.add_argument("--xlsx-max-rows", type=int, default=200_000,
+                        help="Tabel lebih besar dari ini tidak ditulis sebagai Excel; parsing dilewati (default 200000)")
+    parser.add_argument("--work-dir", default=".cache/bench", help="Direktori Drive lokal & snapshot (default .cache/bench)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="File JSON hasil (default: stdout)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    result = run_benchmark(args.work_dir, args.pairs, args.sj_rows, n_names=args.names, n_queries=args.queries,
+                           backend=args.backend, xlsx_max_rows=args.xlsx_max_rows, seed=args.seed)
+    text = json.dumps(result, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text)
+        logger.info("Hasil benchmark ditulis ke %s", args.out)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Logika data dashboard tanpa Streamlit, dibangun sekali per revisi data.
+
+`app.py` hanya menyimpan objek di sini lewat `st.cache_resource` (dikunci revisi) dan
+menampilkan hasilnya. Semua yang mahal, yaitu normalisasi database kemiripan, daftar kategori,
+indeks filter/graf, master list, dan statistik harga, dihitung saat objek dibuat, sehingga
+rerun karena interaksi widget cukup memanggil method yang murah.
+
+- `PairsData`: database kemiripan + `PairFilter`, `SimilarityGraph`, dan daftar kategori.
+- `SjData`: backend Data SJ + `MasterIndex` dan tabel statistik harga per hari.
+"""
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from data_store import compact_frame, normalize_pairs
+from indexes import MasterIndex, PairFilter, SimilarityGraph, find_similar_items, find_similar_items_bulk
+from instrumentation import stage
+from price_stats import PriceStats, window_cutoff
+from table_view import PAIR_DISPLAY_COLUMNS, to_arrow
+
+# Rentang SCORE (min, max) per opsi filter sidebar
+SCORE_FILTERS = {
+    'Tampilkan Semua (>= 90%)': (90, None),
+    'Hampir Identik (>= 95%)': (95, None),
+    'Sangat Mirip (Skor 100)': (100, 100),
+}
+# Skor minimum pasangan yang ikut dicari saat "Sertakan semua barang yang mirip" dicentang
+SIMILAR_HISTORY_MIN_SCORE = 95
+
+FILTER_COLUMNS = ['SCORE', 'KATEGORI_A', 'KATEGORI_B']
+COMPARE_COLUMNS = ['BARANG_A', 'BARANG_B', 'HARGA_A', 'HARGA_B', 'SATUAN', 'KODE_A', 'KODE_B',
+                   'KATEGORI_A', 'KATEGORI_B']
+
+
+def today() -> pd.Timestamp:
+    """Acuan periode (filter waktu dan statistik harga): awal hari ini."""
+    return pd.Timestamp.now().normalize()
+
+
+def load_frame(path: str, revision: str, kind: str) -> pd.DataFrame:
+    """Frame bersih & kompak dari snapshot Parquet; `kind` "pairs" juga dinormalisasi."""
+    df = pd.read_parquet(path)
+    if kind == "pairs":
+        df = normalize_pairs(df)
+    df = compact_frame(df)
+    df.attrs["revision"] = revision
+    return df
+
+
+class PairsData:
+    """Database kemiripan beserta indeks yang dibutuhkan sidebar, tabel hasil, dan tab detail."""
+
+    def __init__(self, db_df: pd.DataFrame):
+        self.df = db_df
+        self.revision: str = db_df.attrs.get("revision", "")
+        self.pair_filter: Optional[PairFilter] = None
+        self.graph: Optional[SimilarityGraph] = None
+        # KATEGORI_A/B bisa tidak ada jika struktur berbeda — handle aman
+        if all(c in db_df.columns for c in FILTER_COLUMNS):
+            self.pair_filter = PairFilter(db_df['SCORE'], db_df['KATEGORI_A'], db_df['KATEGORI_B'])
+        if all(c in db_df.columns for c in ['BARANG_A', 'BARANG_B']):
+            self.graph = SimilarityGraph(db_df['BARANG_A'], db_df['BARANG_B'])
+        self.categories: List[str] = sorted(self.pair_filter.categories) if self.pair_filter is not None else []
+        self.can_compare = self.graph is not None and all(c in db_df.columns for c in COMPARE_COLUMNS)
+
+    @property
+    def empty(self) -> bool:
+        return self.df.empty
+
+    def filter_table(self, categories: Iterable[str], score_option: str) -> pa.Table:
+        """Tabel Arrow hasil filter START, terurut SCORE menurun; kosong tanpa kategori."""
+        categories = list(categories)
+        if not categories or self.pair_filter is None:
+            return to_arrow(self.df.iloc[:0], PAIR_DISPLAY_COLUMNS)
+        positions = self.pair_filter.filter(categories, *SCORE_FILTERS[score_option])
+        return to_arrow(self.df.iloc[positions], PAIR_DISPLAY_COLUMNS)
+
+    def related_positions(self, query: str) -> np.ndarray:
+        """Posisi pasangan yang BARANG_A/BARANG_B-nya mengandung `query` (untuk kartu perbandingan)."""
+        if not self.can_compare:
+            return np.empty(0, dtype=np.int64)
+        return self.graph.search_pairs(query)
+
+    def similar_terms(self, query: str, min_score: float = SIMILAR_HISTORY_MIN_SCORE) -> List[str]:
+        """`query` beserta nama barang di pasangan ber-SCORE >= `min_score` yang mengandung `query`."""
+        if self.graph is None or 'SCORE' not in self.df.columns:
+            return [query]
+        related = self.df.iloc[self.graph.search_pairs(query)]
+        related = related[related['SCORE'] >= min_score]
+        if related.empty:
+            return [query]
+        return list(set([query] + related['BARANG_A'].tolist() + related['BARANG_B'].tolist()))
+
+
+class SjData:
+    """Backend Data SJ beserta master list dan statistik harga (dibangun ulang tiap hari).
+
+    `master_items` (mis. agregat yang dipelihara `refresh.IncrementalRefresher`) dipakai apa
+    adanya; jika tidak diberikan, master list diagregasi dari backend.
+    """
+
+    def __init__(self, backend, master_items: Optional[pd.DataFrame] = None):
+        self.backend = backend
+        self.revision: str = backend.revision
+        self.columns: List[str] = backend.columns
+        self.master: Optional[MasterIndex] = None
+        if master_items is not None:
+            self.master = MasterIndex(master_items)
+        elif 'SJ_CREATED_ON' in self.columns:
+            self.master = MasterIndex(backend.master_items())
+        self._stats_lock = threading.Lock()
+        self._stats: Tuple[Optional[pd.Timestamp], Optional[PriceStats]] = (None, None)
+
+    def price_stats(self, day: pd.Timestamp) -> PriceStats:
+        """Statistik harga semua periode relatif terhadap `day`; hanya dibangun ulang saat hari berganti."""
+        with self._stats_lock:
+            built_for, stats = self._stats
+            if built_for != day:
+                with stage("price_stats") as timed:
+                    table = self.backend.price_stats(day)
+                    timed.rows = len(table)
+                stats = PriceStats(table)
+                self._stats = (day, stats)
+            return stats
+
+    def check_name(self, name: str, graph: Optional[SimilarityGraph], day: pd.Timestamp) -> pd.DataFrame:
+        """Barang mirip di master list (diperluas lewat graf) dengan konteks harga."""
+        return self.price_stats(day).annotate_items(find_similar_items(name, self.master, graph))
+
+    def check_names(self, names: List[str], graph: Optional[SimilarityGraph], day: pd.Timestamp,
+                    top_k: int) -> pd.DataFrame:
+        """Versi massal `check_name` untuk daftar nama hasil upload."""
+        results = find_similar_items_bulk(names, self.master, graph, top_k=top_k)
+        return self.price_stats(day).annotate_items(results)
+
+    def history(self, terms: List[str], period: str, day: pd.Timestamp) -> pd.DataFrame:
+        """Riwayat pembelian untuk `terms` dalam periode filter waktu."""
+        return self.backend.history(terms, since=window_cutoff(period, day))
+
+    def price_context(self, history: pd.DataFrame, period: str,
+                      day: pd.Timestamp) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """(statistik per barang, riwayat + kolom ANOMALI_HARGA) dari tabel statistik periode tersebut."""
+        if not all(c in history.columns for c in ['KODEBARANG', 'SATUAN', 'HARGARATA']):
+            return pd.DataFrame(), history
+        stats = self.price_stats(day)
+        item_stats = stats.for_items(history, period)
+        history = history.assign(ANOMALI_HARGA=stats.flag_anomalies(
+            history['KODEBARANG'], history['SATUAN'], history['HARGARATA'], period
+        ))
+        return item_stats, history
@@ -0,0 +1,450 @@
+"""Sumber data Drive + snapshot Parquet lokal.
+
+Modul ini tidak bergantung pada Streamlit sehingga bisa dipakai (dan diuji)
+dengan klien Drive palsu yang membaca file dari direktori lokal.
+"""
+import csv
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Protocol, Tuple
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from instrumentation import stage
+
+logger = logging.getLogger(__name__)
+
+MIME_GSHEET = "application/vnd.google-apps.spreadsheet"
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MIME_XLS = "application/vnd.ms-excel"
+
+# Naikkan angka ini jika logika pembersihan berubah, agar snapshot lama tidak dipakai lagi
+SNAPSHOT_VERSION = 2
+REVISION_KEY = b"drive_revision"
+# Ukuran chunk download Drive. Default googleapiclient 100 MB per request; 32 MB menjaga
+# jumlah round-trip tetap kecil tanpa menahan satu respons besar di memori.
+DOWNLOAD_CHUNK_SIZE = 32 << 20
+
+
+class DriveClient(Protocol):
+    """Antarmuka minimal yang dibutuhkan loader dari Google Drive."""
+
+    def get_metadata(self, file_id: str) -> dict:
+        """Kembalikan dict berisi name, mimeType, modifiedTime, dan (jika ada) md5Checksum."""
+        ...
+
+    def download(self, file_id: str, mime_type: str, fh: io.IOBase) -> None:
+        """Tulis isi file (XLSX) ke file-like `fh`."""
+        ...
+
+
+class GoogleDriveClient:
+    """Klien Drive asli berbasis googleapiclient (Service Account).
+
+    Objek service googleapiclient (httplib2) tidak thread-safe, jadi setiap thread membuat
+    service sendiri lewat `service_factory`; download paralel antar file aman.
+    """
+
+    def __init__(self, service_factory: Callable[[], object], chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+        self.service_factory = service_factory
+        self.chunk_size = chunk_size
+        self._local = threading.local()
+
+    @property
+    def service(self):
+        if getattr(self._local, "service", None) is None:
+            self._local.service = self.service_factory()
+        return self._local.service
+
+    def get_metadata(self, file_id: str) -> dict:
+        return self.service.files().get(
+            fileId=file_id, fields="name,mimeType,modifiedTime,md5Checksum,version"
+        ).execute()
+
+    def download(self, file_id: str, mime_type: str, fh: io.IOBase) -> None:
+        from googleapiclient.http import MediaIoBaseDownload
+
+        if mime_type == MIME_GSHEET:
+            # Export Google Sheet menjadi XLSX
+            request = self.service.files().export_media(fileId=file_id, mimeType=MIME_XLSX)
+        else:
+            request = self.service.files().get_media(fileId=file_id)
+
+        downloader = MediaIoBaseDownload(fh, request, chunksize=self.chunk_size)
+        done = False
+        while not done:
+            _, done = downloader.next_chunk()
+
+
+class LocalDriveClient:
+    """Drive palsu: melayani `<root>/<file_id>.xlsx` dari direktori lokal."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _path(self, file_id: str) -> Path:
+        matches = sorted(self.root.glob(f"{file_id}.*"))
+        if not matches:
+            raise FileNotFoundError(f"File '{file_id}' tidak ditemukan di {self.root}")
+        return matches[0]
+
+    def get_metadata(self, file_id: str) -> dict:
+        path = self._path(file_id)
+        md5 = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                md5.update(chunk)
+        mtime = datetime.fromtimestamp(path.stat().st_mtime, tz=timezone.utc)
+        return {
+            "name": path.name,
+            "mimeType": MIME_XLSX if path.suffix == ".xlsx" else MIME_XLS,
+            "modifiedTime": mtime.isoformat(),
+            "md5Checksum": md5.hexdigest(),
+        }
+
+    def download(self, file_id: str, mime_type: str, fh: io.IOBase) -> None:
+        with open(self._path(file_id), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                fh.write(chunk)
+
+
+def revision_of(meta: dict) -> str:
+    """Token revisi file Drive. Google Sheet tidak punya md5Checksum, jadi pakai modifiedTime."""
+    token = meta.get("md5Checksum") or f"{meta.get('modifiedTime', '')}#{meta.get('version', '')}"
+    return f"v{SNAPSHOT_VERSION}:{token}"
+
+
+def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalisasi hasil baca Excel: nama kolom, kolom harga, jumlah, dan tanggal."""
+    # --- PERBAIKAN: Membersihkan nama kolom secara otomatis ---
+    df.columns = df.columns.astype(str).str.strip()
+
+    # Bersihkan kolom index sisa export jika ada
+    if "Unnamed: 0" in df.columns:
+        df = df.drop(columns=["Unnamed: 0"])
+
+    # --- PERUBAHAN: Selalu pastikan kolom harga dan jumlah adalah numerik ---
+    currency_cols = ['HARGARATA', 'TOTALHARGA']
+    for col in currency_cols:
+        if col in df.columns:
+            cleaned_val = df[col].astype(str).str.replace(r'[^\d.]', '', regex=True)
+            df[col] = pd.to_numeric(cleaned_val, errors='coerce')
+
+    # --- PERBAIKAN: Mengatasi error casting float ke int ---
+    int_cols = ['JUMLAH', 'JMLDISETUJUI', 'JML_DITERIMA']
+    for col in int_cols:
+        if col in df.columns:
+            # Mengisi NaN dengan 0 dan membulatkan sebelum mengubah ke integer
+            numeric_vals = pd.to_numeric(df[col], errors='coerce').fillna(0)
+            df[col] = numeric_vals.round().astype(int)
+
+    if 'SJ_CREATED_ON' in df.columns:
+        df['SJ_CREATED_ON'] = pd.to_datetime(df['SJ_CREATED_ON'], errors='coerce')
+
+    return df
+
+
+def read_excel(fh, sheet_name: Optional[str] = None) -> pd.DataFrame:
+    """Baca satu sheet Excel (default: sheet pertama) lalu bersihkan.
+
+    Jalur pandas lama; dipertahankan sebagai acuan kesetaraan `stream_excel` (lihat tests).
+    """
+    df = pd.read_excel(fh, sheet_name=sheet_name, engine="openpyxl")
+    if isinstance(df, dict):  # kalau multi-sheet dan sheet_name=None
+        first_key = list(df.keys())[0]
+        df = df[first_key]
+    return clean_frame(df)
+
+
+# --- Pembacaan Excel streaming ---
+CURRENCY_COLS = ('HARGARATA', 'TOTALHARGA')
+INT_COLS = ('JUMLAH', 'JMLDISETUJUI', 'JML_DITERIMA')
+DATE_COLS = ('SJ_CREATED_ON',)
+_NON_NUMERIC = re.compile(r'[^\d.]')
+# Teks yang dibaca `pd.read_excel` sebagai NA secara default (disalin dari pandas; dijaga tests paritas)
+EXCEL_NA_VALUES = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+# Spool download di memori sampai ukuran ini, selebihnya ke file sementara di disk
+SPOOL_MAX_BYTES = 64 << 20
+
+
+def _to_currency(value) -> float:
+    """Setara `str(v)` -> buang karakter non-angka -> `to_numeric(errors='coerce')`, per sel."""
+    if value is None:
+        return np.nan
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # Regex lama ikut membuang tanda '-', jadi nilainya selalu positif
+        return abs(float(value))
+    try:
+        return float(_NON_NUMERIC.sub('', str(value)))
+    except ValueError:
+        return np.nan
+
+
+def _to_int(value) -> int:
+    """Setara `to_numeric(errors='coerce').fillna(0).round().astype(int)`, per sel."""
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        try:
+            number = float(str(value).strip()) if value is not None else np.nan
+        except ValueError:
+            number = np.nan
+    return 0 if np.isnan(number) else int(np.round(number))
+
+
+def _to_cell(value):
+    """Konversi sel seperti `pd.read_excel`: float bulat jadi int, sel kosong dan teks NA (mis. '' atau 'NULL') jadi NaN."""
+    if value is None:
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value in EXCEL_NA_VALUES:
+        return np.nan
+    return value
+
+
+def _column_names(header) -> List[str]:
+    """Nama kolom dari baris header: di-strip, sel kosong jadi 'Unnamed: i', duplikat diberi akhiran '.1', '.2', ..."""
+    names, seen = [], {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None else str(value).strip()
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def stream_excel(fh, sheet_name: Optional[str] = None) -> pd.DataFrame:
+    """Baca satu sheet baris per baris (openpyxl read-only) langsung ke buffer per kolom.
+
+    Hasilnya setara `read_excel` (termasuk pembersihan `clean_frame`), tetapi hanya sheet
+    target yang di-parse, tidak ada DataFrame mentah perantara, dan konversi harga/jumlah
+    dilakukan saat baris dibaca. Tanggal dikonversi sekali per kolom di akhir.
+    """
+    workbook = openpyxl.load_workbook(fh, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        columns = _column_names(header)
+        converters = [
+            _to_currency if col in CURRENCY_COLS else _to_int if col in INT_COLS else _to_cell
+            for col in columns
+        ]
+        buffers: List[list] = [[] for _ in columns]
+        width = len(columns)
+        n_rows = 0   # baris yang sudah masuk buffer
+        blank_run = 0  # baris kosong berturut-turut yang belum tentu disimpan
+        for row in rows:
+            if all(value is None for value in row):
+                blank_run += 1
+                continue
+            # Baris kosong di tengah data tetap disimpan (seperti pandas); yang di ujung dibuang
+            for _ in range(blank_run):
+                for buffer, convert in zip(buffers, converters):
+                    buffer.append(convert(None))
+            n_rows += blank_run + 1
+            blank_run = 0
+            row = row[:width] + (None,) * (width - len(row))
+            for buffer, convert, value in zip(buffers, converters, row):
+                buffer.append(convert(value))
+    finally:
+        workbook.close()
+
+    data = {}
+    for col, convert, buffer in zip(columns, converters, buffers):
+        if convert is _to_currency:
+            values = np.array(buffer, dtype=np.float64)
+            # to_numeric menghasilkan int64 bila semua nilai bulat dan tidak ada yang kosong
+            if np.isfinite(values).all() and (values == np.round(values)).all():
+                values = values.astype(np.int64)
+            data[col] = values
+        elif convert is _to_int:
+            data[col] = np.array(buffer, dtype=int)
+        elif col in DATE_COLS:
+            data[col] = pd.to_datetime(pd.Series(buffer, dtype=object), errors='coerce')
+        else:
+            data[col] = pd.Series(buffer, dtype=object).infer_objects()
+    df = pd.DataFrame(data, columns=columns)
+
+    # Bersihkan kolom index sisa export jika ada
+    if "Unnamed: 0" in df.columns:
+        df = df.drop(columns=["Unnamed: 0"])
+    return df
+
+
+# Kandidat nama kolom berisi nama barang pada file upload (dibandingkan tanpa huruf besar/kecil)
+NAME_COLUMN_CANDIDATES = ("NAMABRG", "NAMA BARANG", "NAMA_BARANG", "NAMA", "BARANG")
+
+
+# Pemisah yang dikenali pada CSV upload; file tanpa pemisah ini dibaca sebagai satu kolom
+CSV_DELIMITERS = ",;\t"
+# Pemisah yang tidak mungkin muncul di teks biasa (ASCII unit separator), untuk CSV satu kolom
+_SINGLE_COLUMN_SEP = "\x1f"
+
+
+def _read_name_csv(fh) -> pd.DataFrame:
+    """CSV upload sebagai frame teks tanpa header; pemisah ditebak hanya dari `CSV_DELIMITERS`.
+
+    Daftar satu kolom (nama barang berisi spasi atau koma) tidak boleh terpecah: jika tidak ada
+    pemisah yang konsisten, atau baris header tidak mengandung pemisah hasil tebakan, seluruh
+    baris dibaca sebagai satu kolom.
+    """
+    raw = fh.read()
+    text = raw.decode("utf-8-sig") if isinstance(raw, bytes) else raw
+    header = text.lstrip("\ufeff").split("\n", 1)[0]
+    try:
+        sep = csv.Sniffer().sniff(text[:64 << 10], delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        sep = _SINGLE_COLUMN_SEP
+    if sep not in header:
+        sep = _SINGLE_COLUMN_SEP
+    return pd.read_csv(io.StringIO(text), dtype=str, sep=sep, header=None)
+
+
+def read_name_list(fh, filename: str) -> List[str]:
+    """Daftar nama barang dari file upload CSV/XLSX.
+
+    Baris pertama dianggap header hanya jika salah satu selnya ada di `NAME_COLUMN_CANDIDATES`
+    (kolom itu yang dipakai); jika tidak, file dianggap daftar tanpa header dan kolom pertama
+    dipakai seluruhnya. Sel kosong dibuang, urutan dipertahankan.
+    """
+    if str(filename).lower().endswith(".csv"):
+        df = _read_name_csv(fh)
+    else:
+        df = pd.read_excel(fh, dtype=str, engine="openpyxl", header=None)
+    if df.empty:
+        return []
+    header = [str(value).strip().upper() for value in df.iloc[0]]
+    column = next((header.index(c) for c in NAME_COLUMN_CANDIDATES if c in header), None)
+    if column is None:
+        values = df.iloc[:, 0]
+    else:
+        values = df.iloc[1:, column]
+    names = values.dropna().astype(str).str.strip()
+    return names[names != ""].tolist()
+
+
+def arrow_safe(df: pd.DataFrame, all_text: bool = False) -> pd.DataFrame:
+    """Kolom object bertipe campuran (mis. kode angka & teks) dijadikan string agar bisa ditulis ke Parquet.
+
+    Dengan `all_text=True` semua kolom object dijadikan string, agar skema beberapa file Parquet
+    (mis. part refresh inkremental) tetap sama. `df` diubah di tempat dan dikembalikan.
+    """
+    for col in df.columns:
+        if df[col].dtype == object:
+            if not all_text:
+                try:
+                    pa.array(df[col], from_pandas=True)
+                    continue
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    pass
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    return df
+
+
+def write_parquet(data, path, metadata: Optional[Dict[bytes, bytes]] = None) -> None:
+    """Tulis DataFrame atau tabel Arrow ke Parquet secara atomik; `metadata` ditambahkan ke skema."""
+    table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)  # atomik: pembaca tidak pernah melihat file setengah jadi
+
+
+class SnapshotStore:
+    """Cache snapshot Parquet di disk, dikunci oleh revisi file Drive.
+
+    Selama metadata Drive (md5Checksum/modifiedTime) tidak berubah, data dibaca dari
+    Parquet lokal tanpa download dan tanpa parsing Excel.
+    """
+
+    def __init__(self, client: DriveClient, cache_dir):
+        self.client = client
+        self.cache_dir = Path(cache_dir)
+        # Satu lock per file snapshot: prefetch latar belakang dan request pengguna tidak download bersamaan
+        self._locks: Dict[Path, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, path: Path) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def path_for(self, file_id: str, sheet_name: Optional[str] = None) -> Path:
+        return self.cache_dir / f"{file_id}__{sheet_name or '_first'}.parquet"
+
+    @staticmethod
+    def stored_revision(path: Path) -> Optional[str]:
+        if not path.exists():
+            return None
+        try:
+            metadata = pq.read_schema(path).metadata or {}
+        except (OSError, pa.ArrowInvalid):
+            return None
+        revision = metadata.get(REVISION_KEY)
+        return revision.decode() if revision else None
+
+    def ensure(self, file_id: str, sheet_name: Optional[str] = None) -> Tuple[Path, str]:
+        """Pastikan snapshot lokal sesuai revisi terbaru di Drive; kembalikan (path, revisi)."""
+        meta = self.client.get_metadata(file_id)
+        revision = revision_of(meta)
+        path = self.path_for(file_id, sheet_name)
+
+        with self._lock_for(path):
+            if self.stored_revision(path) != revision:
+                self._write(path, self._download_and_parse(file_id, sheet_name, meta), revision)
+        return path, revision
+
+    def put(self, file_id: str, df: pd.DataFrame, revision: str, sheet_name: Optional[str] = None) -> Path:
+        """Simpan frame yang sudah bersih sebagai snapshot `file_id` dengan revisi `revision`.
+
+        Untuk data yang tidak berasal dari Drive (mis. benchmark dengan tabel terlalu besar untuk Excel).
+        """
+        path = self.path_for(file_id, sheet_name)
+        with self._lock_for(path):
+            self._write(path, df, revision)
+        return path
+
+    def _download_and_parse(self, file_id: str, sheet_name: Optional[str], meta: dict) -> pd.DataFrame:
+        mime = meta.get("mimeType", "")
+        if mime not in (MIME_GSHEET, MIME_XLSX, MIME_XLS):
+            logger.warning(
+                "File '%s' (mimeType=%s) bukan Excel/Spreadsheet. Pastikan formatnya XLSX atau Google Sheet.",
+                meta.get("name", file_id), mime,
+            )
+
+        # XLSX adalah arsip zip (direktori di akhir file), jadi parser butuh file utuh yang bisa di-seek;
+        # download ditulis ke spool yang pindah ke disk bila besar, bukan ke BytesIO di memori.
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as fh:
+            with stage("drive_download"):
+                self.client.download(file_id, mime, fh)
+            fh.seek(0)
+            with stage("excel_parse") as parse:
+                df = stream_excel(fh, sheet_name)
+                parse.rows = len(df)
+            return df
+
+    def _write(self, path: Path, df: pd.DataFrame, revision: str) -> None:
+        write_parquet(arrow_safe(df), path, {REVISION_KEY: revision.encode()})
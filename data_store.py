@@ -0,0 +1,90 @@
+"""Frame data bersama untuk semua sesi Streamlit.
+
+Frame dibersihkan dan dipadatkan sekali per revisi data, lalu objek yang sama dibagikan ke
+semua sesi (lewat `st.cache_resource`) tanpa salinan. Frame ini diperlakukan read-only:
+app menyalakan copy-on-write pandas sehingga operasi turunan menghasilkan view/frame baru
+dan tidak pernah mengubah data bersama.
+
+Pemadatan tipe:
+- kolom teks dengan nilai unik sedikit (kategori, satuan, kode, nama di Data SJ) -> `category`;
+- kolom teks lain -> string berbasis Arrow;
+- int64 -> int32 jika muat, float64 -> float32 hanya jika nilainya tidak berubah.
+"""
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+# Kolom teks dijadikan `category` jika jumlah nilai uniknya <= rasio ini dari jumlah baris
+CATEGORY_MAX_RATIO = 0.5
+ARROW_STRING = pd.StringDtype("pyarrow")
+
+
+def normalize_pairs(db_df: pd.DataFrame) -> pd.DataFrame:
+    """Database kemiripan dengan nama kolom seragam (BARANG_A, SELISIH_HARGA_PERSEN, ...) dan skor numerik."""
+    db_df = db_df.copy()
+    # Membersihkan nama kolom untuk kemudahan akses
+    db_df.columns = (
+        db_df.columns.astype(str).str.strip()
+        .str.replace(' (%)', '_PERSEN', regex=False)
+        .str.replace(' ', '_')
+    )
+    # Pastikan kolom numerik dalam tipe numeric
+    for col in ['SCORE', 'SELISIH_HARGA_PERSEN']:
+        if col in db_df.columns:
+            db_df[col] = pd.to_numeric(db_df[col], errors='coerce')
+    # Buang baris tanpa SCORE; selisih harga boleh kosong (harga salah satu barang tidak diketahui)
+    if 'SCORE' in db_df.columns:
+        db_df = db_df.dropna(subset=['SCORE']).reset_index(drop=True)
+    return db_df
+
+
+def _compact_text(values: pd.Series, category_max_ratio: float) -> pd.Series:
+    # Faktorisasi dulu: konversi ke str (untuk kolom campuran angka/teks) cukup per nilai unik
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Index([str(v) for v in uniques], dtype=object)
+    if len(uniques) <= category_max_ratio * len(values):
+        return pd.Series(pd.Categorical.from_codes(codes, categories=uniques), index=values.index)
+    text = np.where(codes >= 0, uniques.to_numpy()[codes], None)
+    return pd.Series(text, index=values.index, dtype=ARROW_STRING)
+
+
+def _compact_number(values: pd.Series) -> pd.Series:
+    # Bilangan bulat cukup int32 bila rentangnya muat (harga Rp di atas ~2,1 M tetap int64)
+    if pd.api.types.is_integer_dtype(values) and values.dtype.itemsize > 4:
+        info = np.iinfo(np.int32)
+        if values.empty or (values.min() >= info.min and values.max() <= info.max):
+            return values.astype(np.int32)
+    elif pd.api.types.is_float_dtype(values) and values.dtype.itemsize > 4:
+        narrowed = values.astype(np.float32)
+        # Hanya jika lossless: nilai seperti 94.99999 tidak boleh bergeser melewati ambang skor
+        if np.array_equal(narrowed.to_numpy(dtype=np.float64), values.to_numpy(), equal_nan=True):
+            return narrowed
+    return values
+
+
+def compact_frame(df: pd.DataFrame, category_max_ratio: float = CATEGORY_MAX_RATIO) -> pd.DataFrame:
+    """Salinan `df` dengan tipe kolom sekompak mungkin; `attrs` (mis. revisi) ikut dibawa."""
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+            columns[col] = _compact_text(values, category_max_ratio)
+        elif pd.api.types.is_bool_dtype(values) or pd.api.types.is_datetime64_any_dtype(values):
+            columns[col] = values
+        else:
+            columns[col] = _compact_number(values)
+    compact = pd.DataFrame(columns, index=df.index)
+    compact.attrs.update(df.attrs)
+    return compact
+
+
+def memory_report(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Pemakaian memori per kolom (MB, termasuk isi string) untuk tiap frame bersama."""
+    rows = []
+    for name, df in frames.items():
+        usage = df.memory_usage(index=False, deep=True)
+        for col in df.columns:
+            rows.append({"Data": name, "Kolom": col, "Tipe": str(df[col].dtype), "MB": usage[col] / 2**20})
+    report = pd.DataFrame(rows, columns=["Data", "Kolom", "Tipe", "MB"])
+    return report.sort_values(["Data", "MB"], ascending=[True, False], ignore_index=True)
@@ -0,0 +1,383 @@
+"""Indeks in-memory yang dibangun sekali per revisi data lalu dipakai bersama semua sesi.
+
+Semua struktur di sini read-only setelah dibangun dan tidak bergantung pada Streamlit.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+def group_positions(codes: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Kelompokkan posisi baris per kode (format CSR).
+
+    Baris milik kode `k` adalah `order[indptr[k]:indptr[k + 1]]`. Kode negatif (NaN) diabaikan.
+    """
+    valid = codes >= 0
+    positions = np.flatnonzero(valid)
+    valid_codes = codes[valid]
+    order = positions[np.argsort(valid_codes, kind="stable")]
+    counts = np.bincount(valid_codes, minlength=n_groups)
+    indptr = np.zeros(n_groups + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, order
+
+
+def gather_positions(indptr: np.ndarray, order: np.ndarray, ids: Iterable[int], n_rows: int) -> np.ndarray:
+    """Gabungkan posisi baris CSR untuk `ids` menjadi array posisi yang terurut dan unik."""
+    chunks = [order[indptr[i]:indptr[i + 1]] for i in ids]
+    if not chunks:
+        return np.empty(0, dtype=np.int64)
+    rows = np.concatenate(chunks)
+    if len(rows) * 32 < n_rows:
+        return np.unique(rows)
+    # Hasil besar: bitmap lebih murah daripada sort
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[rows] = True
+    return np.flatnonzero(mask)
+
+
+class NgramIndex:
+    """Indeks terbalik trigram (case-folded) untuk pencarian substring pada daftar nama unik."""
+
+    def __init__(self, names: Sequence[str], n: int = 3):
+        self.n = n
+        self.folded: List[str] = [str(name).casefold() for name in names]
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for i, name in enumerate(self.folded):
+            for gram in {name[j:j + n] for j in range(len(name) - n + 1)}:
+                postings[gram].append(i)
+        self.postings: Dict[str, np.ndarray] = {
+            gram: np.asarray(ids, dtype=np.int64) for gram, ids in postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.folded)
+
+    def search(self, query: str) -> np.ndarray:
+        """Id (terurut) nama yang mengandung `query` sebagai substring, tanpa membedakan huruf besar/kecil."""
+        q = str(query).casefold()
+        if len(q) < self.n:
+            # Query terlalu pendek untuk trigram: cukup scan daftar nama unik
+            return np.asarray([i for i, name in enumerate(self.folded) if q in name], dtype=np.int64)
+
+        grams = {q[j:j + self.n] for j in range(len(q) - self.n + 1)}
+        lists = []
+        for gram in grams:
+            ids = self.postings.get(gram)
+            if ids is None:
+                return np.empty(0, dtype=np.int64)
+            lists.append(ids)
+        lists.sort(key=len)
+        candidates = lists[0]
+        for ids in lists[1:]:
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            if len(candidates) == 0:
+                break
+        # Trigram hanya menyaring kandidat; verifikasi substring yang sebenarnya
+        return np.asarray([i for i in candidates if q in self.folded[i]], dtype=np.int64)
+
+
+class NameRowIndex:
+    """Kolom nama yang di-dictionary-encode: kode per baris, nama unik, dan peta nama -> baris.
+
+    Pencarian substring dicocokkan sekali terhadap nama unik (lewat `NgramIndex`), lalu
+    dipetakan ke posisi baris, sehingga biayanya sebanding dengan jumlah hasil.
+    """
+
+    def __init__(self, names: pd.Series):
+        self.n_rows = len(names)
+        self.codes, uniques = pd.factorize(names)
+        self.names = np.asarray([str(name) for name in uniques], dtype=object)
+        self._indptr, self._order = group_positions(self.codes, len(self.names))
+        self.ngrams = NgramIndex(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def match_names(self, terms: Iterable[str]) -> np.ndarray:
+        """Id nama yang mengandung salah satu `terms` (tanpa membedakan huruf besar/kecil)."""
+        ids = [self.ngrams.search(term) for term in dict.fromkeys(terms)]
+        if not ids:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(ids))
+
+    def search(self, terms: Iterable[str]) -> np.ndarray:
+        """Posisi baris (terurut) yang namanya mengandung salah satu `terms`."""
+        return gather_positions(self._indptr, self._order, self.match_names(terms), self.n_rows)
+
+
+def aggregate_master_items(sj_df: pd.DataFrame) -> pd.DataFrame:
+    """Agregasi Data SJ per (NAMABRG, KODEBARANG, SATUAN): harga & kategori terbaru, tanggal awal/akhir."""
+    sj_df_sorted = sj_df.sort_values(by='SJ_CREATED_ON', ascending=False)
+    return sj_df_sorted.groupby(['NAMABRG', 'KODEBARANG', 'SATUAN'], observed=True).agg(
+        HARGARATA=('HARGARATA', 'first'),
+        KATEGORI=('KATEGORI', 'first'),
+        Permintaan_Terakhir=('SJ_CREATED_ON', 'max'),
+        Permintaan_Awal=('SJ_CREATED_ON', 'min')
+    ).reset_index()
+
+
+def merge_master_items(items: pd.DataFrame, delta_items: pd.DataFrame) -> pd.DataFrame:
+    """Gabungkan agregat master lama dengan agregat dari baris SJ baru.
+
+    Tanggal awal/akhir digabung dengan min/max; harga dan kategori diambil dari sisi
+    dengan permintaan terakhir paling baru (data baru menang jika tanggalnya sama).
+    """
+    if items.empty:
+        return delta_items.reset_index(drop=True)
+    combined = pd.concat([items, delta_items], ignore_index=True)
+    combined = combined.sort_values(by='Permintaan_Terakhir', ascending=True, kind="stable", na_position='first')
+    return combined.groupby(['NAMABRG', 'KODEBARANG', 'SATUAN'], observed=True).agg(
+        HARGARATA=('HARGARATA', 'last'),
+        KATEGORI=('KATEGORI', 'last'),
+        Permintaan_Terakhir=('Permintaan_Terakhir', 'max'),
+        Permintaan_Awal=('Permintaan_Awal', 'min')
+    ).reset_index()
+
+
+class MasterIndex:
+    """Daftar master barang dari Data SJ untuk fitur "Cek Kemiripan".
+
+    Menyimpan hasil agregasi per (NAMABRG, KODEBARANG, SATUAN), daftar nama unik yang
+    siap diberikan ke RapidFuzz, dan peta nama -> posisi baris di `items`.
+    """
+
+    def __init__(self, items: pd.DataFrame):
+        self.items = items.reset_index(drop=True)
+        codes, uniques = pd.factorize(self.items['NAMABRG'])
+        self.names: List[str] = [str(name) for name in uniques]
+        self.name_to_id = {name: i for i, name in enumerate(self.names)}
+        self._indptr, self._order = group_positions(codes, len(self.names))
+
+    @classmethod
+    def from_sj(cls, sj_df: pd.DataFrame) -> "MasterIndex":
+        return cls(aggregate_master_items(sj_df))
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def search(self, query: str, limit: int = 10, score_cutoff: float = 50) -> List[Tuple[str, float]]:
+        """Cari nama master paling mirip dengan `query` (fuzz.ratio, tanpa preprocessing)."""
+        matches = process.extract(query, self.names, scorer=fuzz.ratio, limit=limit, score_cutoff=score_cutoff)
+        return [(name, score) for name, score, _ in matches]
+
+    def search_many(self, queries: Sequence[str], limit: int = 10, score_cutoff: float = 50,
+                    workers: int = -1, batch_size: int = 256) -> List[List[Tuple[str, float]]]:
+        """`search` untuk banyak query sekaligus: satu `process.cdist` per batch, memakai semua core.
+
+        Urutan hasil per query sama dengan `search` (skor menurun, seri menurut urutan nama).
+        """
+        results: List[List[Tuple[str, float]]] = []
+        for start in range(0, len(queries), batch_size):
+            scores = process.cdist(
+                list(queries[start:start + batch_size]), self.names, scorer=fuzz.ratio,
+                score_cutoff=score_cutoff, dtype=np.float32, workers=workers,
+            )
+            for row in scores:
+                candidates = np.flatnonzero(row >= score_cutoff) if score_cutoff else np.arange(len(row))
+                if len(candidates) > limit:
+                    # Ambil sedikit lebih banyak dari `limit` lewat partisi, lalu urutkan stabil
+                    kth = np.partition(row[candidates], len(candidates) - limit)[len(candidates) - limit]
+                    candidates = candidates[row[candidates] >= kth]
+                best = candidates[np.lexsort((candidates, -row[candidates]))][:limit]
+                results.append([(self.names[i], float(row[i])) for i in best])
+        return results
+
+    def positions(self, names: Iterable[str]) -> np.ndarray:
+        """Posisi baris `items` untuk nama-nama yang diberikan (nama tak dikenal diabaikan)."""
+        ids = [self.name_to_id[name] for name in names if name in self.name_to_id]
+        if not ids:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self._order[self._indptr[i]:self._indptr[i + 1]] for i in ids])
+
+    def rows_for(self, names: Iterable[str]) -> pd.DataFrame:
+        return self.items.iloc[self.positions(names)]
+
+
+class SimilarityGraph:
+    """Graf kemiripan dari tabel pasangan (BARANG_A, BARANG_B).
+
+    Nama barang dipetakan ke id integer dan komponen terhubung dihitung sekali,
+    sehingga perluasan "nama terkait" cukup dengan melihat komponen nama tersebut. Indeks trigram atas nama unik memetakan
+    pencarian substring ke id nama lalu ke baris pasangan tanpa scan seluruh tabel.
+    """
+
+    def __init__(self, name_a: pd.Series, name_b: pd.Series):
+        n_pairs = self.n_pairs = len(name_a)
+        codes, uniques = pd.factorize(pd.concat([name_a, name_b], ignore_index=True))
+        self.names = np.asarray([str(name) for name in uniques], dtype=object)
+        self.name_to_id = {name: i for i, name in enumerate(self.names)}
+        self.a_ids = codes[:n_pairs]
+        self.b_ids = codes[n_pairs:]
+        n_nodes = len(self.names)
+
+        # Baris pasangan per nama (nama bisa muncul di sisi A maupun B)
+        self._row_indptr, row_order = group_positions(codes, n_nodes)
+        self._row_order = row_order % n_pairs if n_pairs else row_order
+        self.ngrams = NgramIndex(self.names)
+
+        valid = (self.a_ids >= 0) & (self.b_ids >= 0)
+        src, dst = self.a_ids[valid], self.b_ids[valid]
+        # Cukup satu arah per pasangan: komponen dihitung sebagai graf tak berarah
+        adjacency = coo_matrix((np.ones(len(src), dtype=np.int8), (src, dst)), shape=(n_nodes, n_nodes))
+        self.n_components, self.component = connected_components(adjacency, directed=False)
+        self._comp_indptr, self._comp_order = group_positions(self.component, self.n_components)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def pair_rows(self, name_ids: Iterable[int]) -> np.ndarray:
+        """Posisi baris (terurut, unik) di tabel pasangan yang memuat salah satu `name_ids`."""
+        return gather_positions(self._row_indptr, self._row_order, name_ids, self.n_pairs)
+
+    def search_pairs(self, substring: str) -> np.ndarray:
+        """Posisi baris pasangan yang BARANG_A atau BARANG_B-nya mengandung `substring`."""
+        return self.pair_rows(self.ngrams.search(substring))
+
+    def expand(self, names: Iterable[str]) -> List[str]:
+        """Semua nama yang terhubung (langsung maupun tidak) dengan salah satu `names`."""
+        result = []
+        seen_components = set()
+        for name in dict.fromkeys(names):
+            node = self.name_to_id.get(name)
+            if node is None:
+                result.append(name)
+                continue
+            comp = self.component[node]
+            if comp in seen_components:
+                continue
+            seen_components.add(comp)
+            members = self._comp_order[self._comp_indptr[comp]:self._comp_indptr[comp + 1]]
+            result.extend(self.names[members])
+        return list(dict.fromkeys(result))
+
+
+def _similar_items_frame(query_name: str, names: Iterable[str], master: MasterIndex) -> pd.DataFrame:
+    """Baris master untuk `names`, dinilai ulang terhadap `query_name` dan diurutkan dari skor tertinggi."""
+    variations = master.rows_for(names)
+    if variations.empty:
+        return pd.DataFrame()
+
+    scores = process.cdist(
+        [query_name], variations['NAMABRG'].astype(str).tolist(), scorer=fuzz.ratio, dtype=np.float64
+    )[0]
+    results_df = pd.DataFrame({
+        "Barang Mirip di Data SJ": variations['NAMABRG'].to_numpy(),
+        "Skor Kemiripan (%)": scores,
+        "Harga Rata-Rata": variations['HARGARATA'].to_numpy(),
+        "Kode": variations['KODEBARANG'].to_numpy(),
+        "Kategori": variations['KATEGORI'].to_numpy(),
+        "Satuan": variations['SATUAN'].to_numpy(),
+        "Permintaan Awal": variations['Permintaan_Awal'].to_numpy(),
+        "Permintaan Terakhir": variations['Permintaan_Terakhir'].to_numpy(),
+    })
+    return results_df.sort_values(by="Skor Kemiripan (%)", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def find_similar_items(
+    query: str,
+    master: MasterIndex,
+    graph: Optional[SimilarityGraph] = None,
+    limit: int = 10,
+    score_cutoff: float = 50,
+) -> pd.DataFrame:
+    """Cari barang di master list yang mirip dengan `query`, diperluas dengan nama terkait dari graf.
+
+    Hasil berisi satu baris per (NAMABRG, KODEBARANG, SATUAN), diurutkan dari skor tertinggi.
+    """
+    query_name = query.upper()
+    initial_names = [name for name, _ in master.search(query_name, limit=limit, score_cutoff=score_cutoff)]
+    names = graph.expand(initial_names) if graph is not None else initial_names
+    return _similar_items_frame(query_name, names, master)
+
+
+def find_similar_items_bulk(
+    queries: Sequence[str],
+    master: MasterIndex,
+    graph: Optional[SimilarityGraph] = None,
+    top_k: int = 10,
+    limit: int = 10,
+    score_cutoff: float = 50,
+    workers: int = -1,
+) -> pd.DataFrame:
+    """`find_similar_items` untuk daftar nama sekaligus; `top_k` baris teratas per nama input.
+
+    Fuzzy match awal semua nama dijalankan dalam satu `process.cdist` (per batch), sekali per
+    nama unik (setelah di-uppercase). Hasil berupa satu tabel panjang dengan kolom tambahan
+    "No" (urutan input, mulai 1) dan "Nama Input" (teks input apa adanya), mengikuti urutan
+    input termasuk nama yang berulang; nama input tanpa kecocokan tetap muncul satu baris
+    dengan kolom hasil kosong.
+    """
+    inputs = [str(q) for q in queries if str(q).strip()]
+    keys = [q.strip().upper() for q in inputs]
+    query_names = list(dict.fromkeys(keys))
+    matches = master.search_many(query_names, limit=limit, score_cutoff=score_cutoff, workers=workers)
+
+    by_name = {}
+    for query_name, query_matches in zip(query_names, matches):
+        initial_names = [name for name, _ in query_matches]
+        names = graph.expand(initial_names) if graph is not None else initial_names
+        result = _similar_items_frame(query_name, names, master).head(top_k)
+        by_name[query_name] = result if not result.empty else pd.DataFrame({"Barang Mirip di Data SJ": [None]})
+
+    frames = []
+    for number, (text, key) in enumerate(zip(inputs, keys), start=1):
+        result = by_name[key].copy()
+        result.insert(0, "No", number)
+        result.insert(1, "Nama Input", text)
+        frames.append(result)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+class PairFilter:
+    """Mesin filter tabel pasangan untuk tombol START.
+
+    Urutan baris berdasarkan SCORE (menurun) dihitung sekali, kategori disimpan sebagai
+    kode integer, dan titik potong tiap ambang skor disiapkan di depan. Filter menjadi
+    potongan rentang skor + lookup kategori, dan hasilnya sudah terurut.
+    """
+
+    def __init__(self, score: pd.Series, category_a: pd.Series, category_b: pd.Series,
+                 score_tiers: Sequence[float] = (90, 95, 100)):
+        scores = pd.to_numeric(score, errors='coerce').to_numpy(dtype=np.float64)
+        # Urutan menurun yang stabil; NaN ditaruh di akhir dan tidak pernah lolos ambang
+        self.order = np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind="stable")
+        self._neg_scores = -scores[self.order]
+
+        n_pairs = len(score)
+        codes, uniques = pd.factorize(pd.concat([category_a, category_b], ignore_index=True))
+        self.categories = list(uniques)
+        self._cat_a = codes[:n_pairs][self.order]
+        self._cat_b = codes[n_pairs:][self.order]
+
+        self._cut_points = {tier: self._search(tier) for tier in score_tiers}
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _search(self, threshold: float) -> Tuple[int, int]:
+        """(jumlah baris dengan SCORE > threshold, jumlah baris dengan SCORE >= threshold)."""
+        return (int(np.searchsorted(self._neg_scores, -threshold, side="left")),
+                int(np.searchsorted(self._neg_scores, -threshold, side="right")))
+
+    def score_range(self, min_score: float, max_score: Optional[float] = None) -> Tuple[int, int]:
+        """Rentang [lo, hi) di urutan terurut untuk min_score <= SCORE <= max_score."""
+        hi = (self._cut_points.get(min_score) or self._search(min_score))[1]
+        lo = 0 if max_score is None else (self._cut_points.get(max_score) or self._search(max_score))[0]
+        return lo, max(lo, hi)
+
+    def filter(self, categories: Iterable, min_score: float, max_score: Optional[float] = None) -> np.ndarray:
+        """Posisi baris (terurut SCORE menurun) yang kedua kategorinya ada di `categories`."""
+        lo, hi = self.score_range(min_score, max_score)
+        selected = np.zeros(len(self.categories) + 1, dtype=bool)  # indeks -1 (NaN) selalu False
+        lookup = {category: i for i, category in enumerate(self.categories)}
+        selected[[lookup[c] for c in categories if c in lookup]] = True
+        mask = selected[self._cat_a[lo:hi]] & selected[self._cat_b[lo:hi]]
+        return self.order[lo:hi][mask]
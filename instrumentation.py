@@ -0,0 +1,200 @@
+"""Instrumentasi ringan per tahap: waktu, jumlah baris, delta memori puncak, dan cache hit/miss.
+
+Setiap rerun Streamlit membuat satu `RunTrace` dan memasangnya sebagai trace aktif untuk
+thread tersebut; rerun yang hanya menjalankan satu fragment membuat trace sendiri dengan
+`scope` nama fragment tersebut. Kode di mana pun (termasuk modul tanpa Streamlit seperti `data_source`)
+cukup memakai `stage("nama")`; jika tidak ada trace aktif (mis. thread prefetch), tahap tetap
+dicatat sebagai baris log terstruktur.
+
+Delta memori puncak diukur dengan `tracemalloc` hanya bila trace dibuat dengan
+`track_memory=True` (lebih lambat). `tracemalloc` hanya menyala selama ada trace seperti itu
+yang sedang berjalan dan dimatikan begitu trace terakhir ditutup; trace yang tidak pernah
+ditutup (mis. rerun terhenti exception) dilepas setelah `MEMORY_RUN_TIMEOUT` detik.
+`tracemalloc` bersifat global per proses, jadi angka ini bisa ikut tercampur alokasi sesi
+lain yang berjalan bersamaan.
+"""
+import json
+import logging
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+# Trace yang sedang berjalan dengan pengukuran memori: run_id -> waktu mulai (perf_counter)
+_memory_runs: Dict[str, float] = {}
+_memory_lock = threading.Lock()
+# Batas umur trace ber-tracemalloc yang tidak ditutup; setelah itu tracemalloc boleh dimatikan
+MEMORY_RUN_TIMEOUT = 10 * 60
+
+
+class StageHandle:
+    """Objek yang diterima blok `with stage(...)`; isi `rows` jika jumlah baris baru diketahui di dalam blok."""
+
+    def __init__(self, rows: Optional[int] = None):
+        self.rows = rows
+        self.peak = 0  # puncak memori tahap bersarang (byte), untuk tahap luar
+
+
+class RunTrace:
+    """Catatan satu rerun (seluruh app atau satu fragment): daftar tahap dan cache hit/miss."""
+
+    def __init__(self, session: str = "", track_memory: bool = False, scope: str = "app"):
+        self.session = session
+        self.scope = scope
+        self.run_id = uuid.uuid4().hex[:8]
+        self.track_memory = track_memory
+        self.stages: List[dict] = []
+        self.cache: Dict[str, Dict[str, int]] = {}
+        self.started = time.perf_counter()
+        self.finished = False
+        self._elapsed_ms: Optional[float] = None
+
+    def cache_event(self, name: str, hit: bool) -> None:
+        counts = self.cache.setdefault(name, {"hit": 0, "miss": 0})
+        counts["hit" if hit else "miss"] += 1
+
+    def total_ms(self) -> float:
+        """Durasi rerun; dibekukan saat trace ditutup."""
+        if self._elapsed_ms is not None:
+            return self._elapsed_ms
+        return (time.perf_counter() - self.started) * 1000
+
+    def stages_frame(self) -> pd.DataFrame:
+        frame = pd.DataFrame(self.stages, columns=["stage", "ms", "rows", "mem_delta_mb"])
+        return frame.astype({"rows": "Int64", "mem_delta_mb": "Float64"})
+
+    def cache_frame(self) -> pd.DataFrame:
+        rows = [{"cache": name, **counts} for name, counts in self.cache.items()]
+        return pd.DataFrame(rows, columns=["cache", "hit", "miss"])
+
+    def close(self) -> None:
+        """Tandai trace selesai dan lepaskan permintaan tracemalloc-nya (idempoten)."""
+        if self.finished:
+            return
+        self._elapsed_ms = self.total_ms()
+        self.finished = True
+        if self.track_memory:
+            with _memory_lock:
+                _memory_runs.pop(self.run_id, None)
+                _sync_tracing()
+
+    def log_summary(self) -> None:
+        """Tutup trace dan catat ringkasannya; tahap berikutnya di thread ini butuh trace baru."""
+        self.close()
+        _log({"event": "rerun", "session": self.session, "run": self.run_id, "scope": self.scope,
+              "ms": round(self.total_ms(), 3), "stages": len(self.stages), "cache": self.cache})
+
+
+def _log(record: dict) -> None:
+    logger.info(json.dumps(record, default=str))
+
+
+def _sync_tracing() -> None:
+    """Nyalakan/matikan tracemalloc sesuai `_memory_runs`; dipanggil dengan `_memory_lock` dipegang."""
+    if _memory_runs and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not _memory_runs and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def start_run(session: str = "", track_memory: bool = False, scope: str = "app") -> RunTrace:
+    """Buat trace baru dan jadikan trace aktif untuk thread ini.
+
+    Trace sebelumnya di thread ini yang belum ditutup ikut ditutup. `tracemalloc` hanya
+    menyala selama trace dengan `track_memory=True` masih berjalan.
+    """
+    previous = current_trace()
+    if previous is not None:
+        previous.close()
+    trace = RunTrace(session, track_memory, scope)
+    with _memory_lock:
+        now = time.perf_counter()
+        for run_id, started in list(_memory_runs.items()):
+            if now - started > MEMORY_RUN_TIMEOUT:
+                del _memory_runs[run_id]
+        if track_memory:
+            _memory_runs[trace.run_id] = trace.started
+        _sync_tracing()
+    _local.trace = trace
+    _local.stages = []
+    return trace
+
+
+def current_trace() -> Optional[RunTrace]:
+    return getattr(_local, "trace", None)
+
+
+def active_trace() -> Optional[RunTrace]:
+    """Trace aktif yang belum ditutup `log_summary`, mis. rerun penuh yang sedang berjalan."""
+    trace = current_trace()
+    return trace if trace is not None and not trace.finished else None
+
+
+def _stage_stack() -> List[StageHandle]:
+    if not hasattr(_local, "stages"):
+        _local.stages = []
+    return _local.stages
+
+
+@contextmanager
+def stage(name: str, rows: Optional[int] = None):
+    """Ukur blok kode sebagai satu tahap: waktu, baris (opsional), dan delta memori puncak (MB)."""
+    trace = active_trace()
+    handle = StageHandle(rows)
+    track_memory = trace is not None and trace.track_memory and tracemalloc.is_tracing()
+    stack = _stage_stack()
+    if track_memory:
+        base, outer_peak = tracemalloc.get_traced_memory()
+        # Puncak tahap luar sejauh ini disimpan dulu karena reset_peak di bawah menghapusnya
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, outer_peak)
+        handle.peak = base
+        tracemalloc.reset_peak()
+    stack.append(handle)
+    started = time.perf_counter()
+    try:
+        yield handle
+    finally:
+        stack.pop()
+        record = {"stage": name, "ms": round((time.perf_counter() - started) * 1000, 3), "rows": handle.rows,
+                  "mem_delta_mb": None}
+        if track_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, handle.peak)
+            record["mem_delta_mb"] = round((peak - base) / 2**20, 3)
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+        if trace is not None:
+            trace.stages.append(record)
+            _log({"event": "stage", "session": trace.session, "run": trace.run_id, **record})
+        else:
+            _log({"event": "stage", "thread": threading.current_thread().name, **record})
+
+
+def record_cache_miss(name: str) -> None:
+    """Dipanggil dari dalam badan fungsi ber-cache: badan hanya berjalan saat cache miss."""
+    if not hasattr(_local, "misses"):
+        _local.misses = set()
+    _local.misses.add(name)
+
+
+@contextmanager
+def cache_probe(name: str):
+    """Catat hit/miss pemanggilan fungsi ber-cache `name` di dalam blok ini ke trace aktif."""
+    if not hasattr(_local, "misses"):
+        _local.misses = set()
+    _local.misses.discard(name)
+    try:
+        yield
+    finally:
+        trace = active_trace()
+        if trace is not None:
+            trace.cache_event(name, hit=name not in _local.misses)
+        _local.misses.discard(name)
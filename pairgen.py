@@ -0,0 +1,181 @@
+"""Pembangkit database kemiripan barang dari Data SJ.
+
+Menghasilkan tabel BARANG_A/BARANG_B/SCORE/SELISIH_HARGA_PERSEN (format yang sama dengan
+file FILE_ID_DB) tanpa membandingkan semua N² pasangan nama:
+
+1. Blocking: MinHash LSH atas trigram karakter tiap nama menghasilkan kandidat pasangan.
+2. Scoring: kandidat dinilai dengan RapidFuzz `fuzz.ratio` secara paralel (`process.cpdist`).
+3. Output ditulis ke Parquet.
+
+Contoh:
+    python pairgen.py --sj .cache/snapshots/<file_id>___first.parquet --out .cache/pairs.parquet
+"""
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from datasketch import LeanMinHash, MinHash, MinHashLSH
+from rapidfuzz import fuzz, process
+
+from data_source import write_parquet
+from indexes import aggregate_master_items
+from table_view import PAIR_DISPLAY_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+def items_from_master(master_items: pd.DataFrame) -> pd.DataFrame:
+    """Satu baris per NAMABRG dari master list: kode, satuan, kategori, dan harga dari permintaan terbaru."""
+    latest = master_items.sort_values(by='Permintaan_Terakhir', ascending=False, kind="stable")
+    items = latest.groupby('NAMABRG', sort=True).agg(
+        KODEBARANG=('KODEBARANG', 'first'),
+        SATUAN=('SATUAN', 'first'),
+        KATEGORI=('KATEGORI', 'first'),
+        HARGARATA=('HARGARATA', 'first'),
+    ).reset_index()
+    items['NAMABRG'] = items['NAMABRG'].astype(str)
+    return items
+
+
+def build_items(sj_df: pd.DataFrame) -> pd.DataFrame:
+    """Item per NAMABRG langsung dari Data SJ."""
+    return items_from_master(aggregate_master_items(sj_df))
+
+
+def shingles(name: str, n: int = 3) -> List[bytes]:
+    """Trigram karakter (dengan padding spasi) dari nama yang sudah di-casefold."""
+    padded = f" {name.casefold()} "
+    if len(padded) <= n:
+        return [padded.encode()]
+    return list({padded[i:i + n].encode() for i in range(len(padded) - n + 1)})
+
+
+def minhash_signatures(names: List[str], num_perm: int = 64) -> np.ndarray:
+    """Signature MinHash per nama, shape (len(names), num_perm)."""
+    if not names:
+        return np.empty((0, num_perm), dtype=np.uint64)
+    minhashes = MinHash.bulk([shingles(name) for name in names], num_perm=num_perm)
+    return np.vstack([minhash.hashvalues for minhash in minhashes]).astype(np.uint64)
+
+
+def candidate_pairs(signatures: np.ndarray, threshold: float = 0.4, new_from: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Kandidat pasangan (i, j), i < j, dari MinHash LSH.
+
+    Hanya nama dengan indeks >= `new_from` yang di-query, sehingga pada refresh inkremental
+    cukup nama baru yang dibandingkan dengan seluruh nama (lama maupun baru).
+    """
+    num_perm = signatures.shape[1]
+    if new_from >= len(signatures):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    lsh = MinHashLSH(threshold=threshold, num_perm=num_perm)
+    minhashes = [LeanMinHash(seed=1, hashvalues=row) for row in signatures]
+    with lsh.insertion_session() as session:
+        for i, minhash in enumerate(minhashes):
+            session.insert(i, minhash, check_duplication=False)
+
+    left, right = [], []
+    for i in range(new_from, len(minhashes)):
+        for j in lsh.query(minhashes[i]):
+            # Pasangan baru-lama selalu diambil; pasangan antar nama baru cukup sekali (j > i)
+            if j < new_from or j > i:
+                left.append(min(i, j))
+                right.append(max(i, j))
+    return np.asarray(left, dtype=np.int64), np.asarray(right, dtype=np.int64)
+
+
+def score_pairs(names: List[str], left: np.ndarray, right: np.ndarray,
+                min_score: float = 90, workers: int = -1) -> np.ndarray:
+    """Skor fuzz.ratio per kandidat (semua core bila workers=-1); skor di bawah ambang menjadi 0."""
+    if len(left) == 0:
+        return np.empty(0, dtype=np.float64)
+    names_arr = np.asarray(names, dtype=object)
+    return process.cpdist(
+        names_arr[left].tolist(), names_arr[right].tolist(),
+        scorer=fuzz.ratio, score_cutoff=min_score, dtype=np.float64, workers=workers,
+    )
+
+
+def price_gap_percent(price_a: np.ndarray, price_b: np.ndarray) -> np.ndarray:
+    """Selisih harga relatif terhadap harga yang lebih rendah, dalam persen.
+
+    NaN jika salah satu harga kosong atau nol; pasangannya tetap disimpan (kolom selisih kosong).
+    """
+    price_a = np.asarray(price_a, dtype=np.float64)
+    price_b = np.asarray(price_b, dtype=np.float64)
+    lower = np.fmin(price_a, price_b)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gap = np.abs(price_a - price_b) / lower * 100
+    return np.where(lower > 0, gap, np.nan)
+
+
+def assemble_pairs(items: pd.DataFrame, left: np.ndarray, right: np.ndarray, scores: np.ndarray) -> pd.DataFrame:
+    """Bentuk tabel pasangan dengan kolom yang sama seperti database kemiripan di Drive."""
+    pairs = pd.DataFrame({
+        "SCORE": scores,
+        "BARANG_A": items['NAMABRG'].to_numpy()[left],
+        "BARANG_B": items['NAMABRG'].to_numpy()[right],
+    })
+    return refresh_pair_details(pairs, items)
+
+
+def refresh_pair_details(pairs: pd.DataFrame, items: pd.DataFrame) -> pd.DataFrame:
+    """Isi ulang harga, kode, satuan, kategori, dan selisih harga pasangan dari `items` terbaru."""
+    lookup = items.set_index('NAMABRG')
+    a = lookup.reindex(pairs['BARANG_A'])
+    b = lookup.reindex(pairs['BARANG_B'])
+    pairs = pd.DataFrame({
+        "SCORE": pairs['SCORE'].to_numpy(),
+        "SELISIH_HARGA_PERSEN": price_gap_percent(a['HARGARATA'], b['HARGARATA']),
+        "BARANG_A": pairs['BARANG_A'].to_numpy(), "HARGA_A": a['HARGARATA'].to_numpy(),
+        "SATUAN": a['SATUAN'].to_numpy(), "KODE_A": a['KODEBARANG'].to_numpy(), "KATEGORI_A": a['KATEGORI'].to_numpy(),
+        "BARANG_B": pairs['BARANG_B'].to_numpy(), "HARGA_B": b['HARGARATA'].to_numpy(),
+        "KODE_B": b['KODEBARANG'].to_numpy(), "KATEGORI_B": b['KATEGORI'].to_numpy(),
+    }, columns=PAIR_DISPLAY_COLUMNS)
+    return pairs.sort_values(by="SCORE", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def generate_pairs(items: pd.DataFrame, min_score: float = 90, lsh_threshold: float = 0.4,
+                   num_perm: int = 64, workers: int = -1) -> pd.DataFrame:
+    """Bangun seluruh tabel pasangan dari `items` (hasil `build_items`)."""
+    names = items['NAMABRG'].tolist()
+    left, right = candidate_pairs(minhash_signatures(names, num_perm), threshold=lsh_threshold)
+    scores = score_pairs(names, left, right, min_score=min_score, workers=workers)
+    keep = scores >= min_score
+    logger.info("%d nama, %d kandidat, %d pasangan >= %s", len(names), len(left), int(keep.sum()), min_score)
+    return assemble_pairs(items, left[keep], right[keep], scores[keep])
+
+
+def read_sj(path) -> pd.DataFrame:
+    """Baca Data SJ dari Parquet (mis. snapshot) atau Excel."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    from data_source import stream_excel
+    with open(path, "rb") as fh:
+        return stream_excel(fh)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bangun database kemiripan barang dari Data SJ.")
+    parser.add_argument("--sj", required=True, help="Data SJ (.parquet atau .xlsx)")
+    parser.add_argument("--out", required=True, help="File Parquet output")
+    parser.add_argument("--min-score", type=float, default=90, help="Skor fuzz.ratio minimum (default 90)")
+    parser.add_argument("--lsh-threshold", type=float, default=0.4, help="Ambang Jaccard MinHash LSH; turunkan untuk recall lebih tinggi (default 0.4)")
+    parser.add_argument("--num-perm", type=int, default=64, help="Jumlah permutasi MinHash (default 64)")
+    parser.add_argument("--workers", type=int, default=-1, help="Jumlah worker scoring (-1 = semua core)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    started = time.perf_counter()
+    items = build_items(read_sj(args.sj))
+    pairs = generate_pairs(items, min_score=args.min_score, lsh_threshold=args.lsh_threshold,
+                           num_perm=args.num_perm, workers=args.workers)
+    write_parquet(pairs, args.out)
+    logger.info("%d pasangan ditulis ke %s dalam %.1f detik", len(pairs), args.out, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
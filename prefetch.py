@@ -0,0 +1,106 @@
+"""Warm-up dan refresh snapshot Drive di thread latar belakang.
+
+Saat proses dashboard mulai, semua file sumber (database kemiripan dan Data SJ) di-download
+dan di-parse bersamaan, masing-masing di thread sendiri. Setelah itu revisinya dicek ulang
+secara berkala (lebih sering dari TTL cache) sehingga snapshot baru sudah siap sebelum
+dibutuhkan. Request pengguna cukup membaca `current()`: pasangan (path, revisi) terakhir
+yang sudah lengkap, ditukar secara atomik setelah snapshot dan callback `on_update` selesai.
+
+Hanya satu prefetcher yang berjalan per proses: `activate` menghentikan prefetcher sebelumnya
+(mis. yang dibuat sebelum `st.cache_resource` membuang resource-nya) sebelum menjalankan yang baru.
+
+Modul ini tidak bergantung pada Streamlit.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from data_source import SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+# Cek revisi tiap 15 menit; TTL cache loader di app adalah 1 jam
+DEFAULT_INTERVAL = 15 * 60
+
+# Prefetcher yang sedang aktif di proses ini (lihat `activate`)
+_active: Optional["Prefetcher"] = None
+_active_lock = threading.Lock()
+
+
+class Prefetcher:
+    """Menjaga snapshot beberapa file Drive tetap mutakhir di latar belakang.
+
+    `sources` memetakan nama sumber (mis. "pairs", "sj") ke (file_id, sheet_name).
+    `on_update(name, path, revision)` dipanggil di thread worker setiap kali revisi baru
+    didapat, sebelum revisi itu terlihat lewat `current()` (mis. untuk membangun frame/indeks
+    bersama lebih dulu).
+    """
+
+    def __init__(self, store: SnapshotStore, sources: Dict[str, Tuple[str, Optional[str]]],
+                 interval: float = DEFAULT_INTERVAL,
+                 on_update: Optional[Callable[[str, Path, str], None]] = None):
+        self.store = store
+        self.sources = dict(sources)
+        self.interval = interval
+        self.on_update = on_update
+        self._current: Dict[str, Tuple[Path, str]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "Prefetcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="drive-prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Hentikan thread setelah putaran refresh yang sedang berjalan selesai."""
+        self._stop.set()
+
+    def current(self, name: str) -> Optional[Tuple[Path, str]]:
+        """Snapshot (path, revisi) terakhir yang siap untuk sumber `name`; None jika belum ada."""
+        with self._lock:
+            return self._current.get(name)
+
+    def refresh(self, name: str) -> None:
+        file_id, sheet_name = self.sources[name]
+        path, revision = self.store.ensure(file_id, sheet_name)
+        previous = self.current(name)
+        if previous is not None and previous[1] == revision:
+            return
+        if self.on_update is not None:
+            self.on_update(name, path, revision)
+        with self._lock:
+            self._current[name] = (path, revision)
+        logger.info("Snapshot '%s' siap (revisi %s)", name, revision)
+
+    def refresh_all(self) -> None:
+        """Refresh semua sumber bersamaan; kegagalan satu sumber tidak menghentikan yang lain."""
+        with ThreadPoolExecutor(max_workers=len(self.sources) or 1, thread_name_prefix="drive-prefetch") as pool:
+            futures = {name: pool.submit(self.refresh, name) for name in self.sources}
+        for name, future in futures.items():
+            error = future.exception()
+            if error is not None:
+                logger.warning("Prefetch '%s' gagal: %s", name, error)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.refresh_all()
+            self._stop.wait(self.interval)
+
+
+def activate(prefetcher: Prefetcher) -> Prefetcher:
+    """Jadikan `prefetcher` satu-satunya prefetcher aktif di proses ini.
+
+    Prefetcher aktif sebelumnya dihentikan agar thread-nya tidak terus mengecek Drive;
+    `prefetcher` hanya dijalankan jika punya sumber.
+    """
+    global _active
+    with _active_lock:
+        if _active is not None and _active is not prefetcher:
+            _active.stop()
+        _active = prefetcher
+    return prefetcher.start() if prefetcher.sources else prefetcher
@@ -0,0 +1,136 @@
+"""Statistik harga per (KODEBARANG, SATUAN), dimaterialisasi sekali per revisi data.
+
+Tabel berisi satu baris per barang per periode (sama dengan opsi filter waktu di tab
+"Tinjau Data SJ"): harga terakhir, median, min/max, kuartil, IQR, dan jumlah permintaan.
+Tampilan konsistensi harga dan penanda anomali membaca tabel ini, bukan memindai ulang
+riwayat SJ.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Periode statistik = opsi filter waktu riwayat; None berarti seluruh riwayat
+TIME_WINDOWS: Dict[str, Optional[pd.DateOffset]] = {
+    'Tampilkan Semua': None,
+    '3 Bulan Terakhir': pd.DateOffset(months=3),
+    '6 Bulan Terakhir': pd.DateOffset(months=6),
+    '1 Tahun Terakhir': pd.DateOffset(years=1),
+}
+
+KEY_COLUMNS = ['KODEBARANG', 'SATUAN']
+STAT_COLUMNS = [
+    'KODEBARANG', 'SATUAN', 'PERIODE', 'HARGA_TERAKHIR', 'HARGA_MEDIAN', 'HARGA_MIN', 'HARGA_MAX',
+    'HARGA_Q1', 'HARGA_Q3', 'HARGA_IQR', 'JUMLAH_PERMINTAAN', 'PERMINTAAN_TERAKHIR',
+]
+# Jumlah harga minimum agar kuartil cukup bermakna untuk penanda anomali
+MIN_PRICES_FOR_ANOMALY = 4
+
+
+def window_cutoff(period: str, now: Optional[pd.Timestamp] = None) -> Optional[pd.Timestamp]:
+    """Tanggal awal periode (inklusif); None untuk seluruh riwayat."""
+    offset = TIME_WINDOWS[period]
+    if offset is None:
+        return None
+    return (now if now is not None else pd.Timestamp.now()) - offset
+
+
+def build_price_stats(sj_df: pd.DataFrame, now: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """Statistik harga semua periode dari Data SJ dengan groupby vektor (satu sort untuk semua periode)."""
+    if sj_df.empty or not all(c in sj_df.columns for c in KEY_COLUMNS + ['HARGARATA', 'SJ_CREATED_ON']):
+        return pd.DataFrame(columns=STAT_COLUMNS)
+    rows = pd.DataFrame({
+        'KODEBARANG': sj_df['KODEBARANG'].astype(str),
+        'SATUAN': sj_df['SATUAN'].astype(str),
+        'HARGARATA': pd.to_numeric(sj_df['HARGARATA'], errors='coerce').astype(np.float64),
+        'SJ_CREATED_ON': sj_df['SJ_CREATED_ON'],
+    })
+    rows = rows[sj_df['KODEBARANG'].notna().to_numpy() & sj_df['SATUAN'].notna().to_numpy()]
+    rows = rows.sort_values('SJ_CREATED_ON', kind="stable", na_position='first')
+
+    frames = []
+    for period in TIME_WINDOWS:
+        cutoff = window_cutoff(period, now)
+        window = rows if cutoff is None else rows[rows['SJ_CREATED_ON'] >= cutoff]
+        if window.empty:
+            continue
+        grouped = window.groupby(KEY_COLUMNS, sort=True)
+        prices = grouped['HARGARATA']
+        stats = pd.DataFrame({
+            'HARGA_TERAKHIR': prices.last(),  # `last` melewati NaN: harga terisi paling baru
+            'HARGA_MEDIAN': prices.median(),
+            'HARGA_MIN': prices.min(),
+            'HARGA_MAX': prices.max(),
+            'HARGA_Q1': prices.quantile(0.25),
+            'HARGA_Q3': prices.quantile(0.75),
+            'JUMLAH_PERMINTAAN': grouped.size(),
+            'PERMINTAAN_TERAKHIR': grouped['SJ_CREATED_ON'].max(),
+        })
+        stats['HARGA_IQR'] = stats['HARGA_Q3'] - stats['HARGA_Q1']
+        stats['PERIODE'] = period
+        frames.append(stats.reset_index())
+    if not frames:
+        return pd.DataFrame(columns=STAT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[STAT_COLUMNS]
+
+
+class PriceStats:
+    """Tabel statistik harga dengan lookup cepat per (KODEBARANG, SATUAN, PERIODE)."""
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table
+        self._by_key = table.set_index(['PERIODE'] + KEY_COLUMNS).sort_index()
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def lookup(self, codes, units, period: str) -> pd.DataFrame:
+        """Baris statistik untuk pasangan (kode, satuan) yang diberikan, sejajar dengan input (NaN jika tidak ada)."""
+        index = pd.MultiIndex.from_arrays([
+            np.full(len(codes), period, dtype=object),
+            pd.Series(codes).astype(str).to_numpy(),
+            pd.Series(units).astype(str).to_numpy(),
+        ])
+        return self._by_key.reindex(index).reset_index(drop=True)
+
+    def for_items(self, items: pd.DataFrame, period: str) -> pd.DataFrame:
+        """Statistik periode `period` untuk kombinasi KODEBARANG/SATUAN unik di `items`."""
+        keys = items[KEY_COLUMNS].astype(str).drop_duplicates()
+        stats = self.lookup(keys['KODEBARANG'], keys['SATUAN'], period)
+        stats.insert(0, 'KODEBARANG', keys['KODEBARANG'].to_numpy())
+        stats.insert(1, 'SATUAN', keys['SATUAN'].to_numpy())
+        return stats.dropna(subset=['JUMLAH_PERMINTAAN']).reset_index(drop=True)
+
+    def flag_anomalies(self, codes, units, prices, period: str, k: float = 1.5) -> np.ndarray:
+        """True untuk harga di luar pagar Tukey [Q1 - k*IQR, Q3 + k*IQR] barangnya pada periode tersebut.
+
+        Barang dengan kurang dari `MIN_PRICES_FOR_ANOMALY` permintaan tidak pernah ditandai.
+        """
+        if len(codes) == 0:
+            return np.zeros(0, dtype=bool)
+        stats = self.lookup(codes, units, period)
+        price = pd.to_numeric(pd.Series(prices), errors='coerce').to_numpy(dtype=np.float64)
+        lower = (stats['HARGA_Q1'] - k * stats['HARGA_IQR']).to_numpy(dtype=np.float64)
+        upper = (stats['HARGA_Q3'] + k * stats['HARGA_IQR']).to_numpy(dtype=np.float64)
+        enough = stats['JUMLAH_PERMINTAAN'].to_numpy(dtype=np.float64) >= MIN_PRICES_FOR_ANOMALY
+        with np.errstate(invalid="ignore"):
+            return enough & ((price < lower) | (price > upper))
+
+    def annotate_items(self, results: pd.DataFrame, period: str = 'Tampilkan Semua') -> pd.DataFrame:
+        """Tambahkan konteks harga ke hasil cek kemiripan (kolom Kode/Satuan/Harga Rata-Rata).
+
+        Baris tanpa statistik (mis. nama input cek massal tanpa kecocokan) dibiarkan kosong.
+        """
+        if results.empty or not all(c in results.columns for c in ['Kode', 'Satuan', 'Harga Rata-Rata']):
+            return results
+        stats = self.lookup(results['Kode'], results['Satuan'], period)
+        missing = stats['JUMLAH_PERMINTAAN'].isna().to_numpy()
+        anomaly = pd.array(self.flag_anomalies(
+            results['Kode'], results['Satuan'], results['Harga Rata-Rata'], period
+        ), dtype="boolean")
+        anomaly[missing] = pd.NA
+        annotated = results.copy()
+        annotated['Harga Median'] = stats['HARGA_MEDIAN'].to_numpy()
+        annotated['Jumlah Permintaan'] = stats['JUMLAH_PERMINTAAN'].astype('Int64').array
+        annotated['Harga Anomali'] = anomaly
+        return annotated
@@ -0,0 +1,211 @@
+"""Refresh inkremental Data SJ dan database kemiripan.
+
+Data SJ hanya bertambah (surat jalan baru di-append), jadi refresh cukup memproses baris
+yang lebih baru dari `SJ_CREATED_ON` maksimum yang sudah tersimpan:
+
+- baris baru ditulis sebagai file part baru di `<state_dir>/sj/`;
+- agregat per barang (tanggal awal/akhir, harga terbaru) diperbarui dari baris baru saja;
+- hanya nama yang baru muncul yang di-scoring terhadap seluruh nama untuk memperluas
+  tabel pasangan. Signature MinHash nama lama disimpan sehingga tidak dihitung ulang.
+
+State pertama kali (direktori kosong) dibangun dengan jalur yang sama: semua baris dianggap baru.
+
+Contoh:
+    python refresh.py --sj .cache/snapshots/<file_id>___first.parquet --state-dir .cache/incremental
+"""
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_source import arrow_safe, write_parquet
+from indexes import aggregate_master_items, merge_master_items
+from pairgen import (
+    candidate_pairs, items_from_master, minhash_signatures, read_sj, refresh_pair_details, score_pairs,
+)
+from table_view import PAIR_DISPLAY_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+# Pengganti nilai kosong saat membandingkan baris; tidak mungkin muncul di data
+_NULL_TOKEN = "\x00"
+
+
+def _row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """Hash isi baris yang sama untuk frame baru dan baris yang dibaca ulang dari part Parquet.
+
+    Kedua sisi dinormalisasi seperti saat part ditulis (`arrow_safe(all_text=True)`); angka
+    dibandingkan sebagai float dan semua nilai kosong (NaN/None/NaT/NA) menjadi satu token.
+    """
+    df = arrow_safe(df.copy(), all_text=True)
+    text = {}
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            values = values.astype(np.float64)
+        text[col] = values.astype(str).where(values.notna().to_numpy(), _NULL_TOKEN)
+    return pd.util.hash_pandas_object(pd.DataFrame(text, index=df.index), index=False).to_numpy()
+
+
+class IncrementalRefresher:
+    """State refresh inkremental di satu direktori lokal.
+
+    Isi `state_dir`:
+    - `sj/part-NNNNN.parquet`: baris Data SJ, satu part per refresh;
+    - `master_items.parquet`: agregat per (NAMABRG, KODEBARANG, SATUAN);
+    - `items.parquet` + `signatures.npy`: item per nama (urutan tetap) dan signature MinHash-nya;
+    - `pairs.parquet`: database kemiripan;
+    - `state.json`: `SJ_CREATED_ON` maksimum dan ringkasan refresh terakhir.
+
+    Dashboard membaca state ini lewat `DASHBOARD_INCREMENTAL_DIR`: Data SJ dari `sj/`,
+    master list dari `master_items.parquet`, dan database kemiripan dari `pairs.parquet`.
+    """
+
+    def __init__(self, state_dir, min_score: float = 90, lsh_threshold: float = 0.4,
+                 num_perm: int = 64, workers: int = -1):
+        self.state_dir = Path(state_dir)
+        self.min_score = min_score
+        self.lsh_threshold = lsh_threshold
+        self.num_perm = num_perm
+        self.workers = workers
+
+    @property
+    def pairs_path(self) -> Path:
+        return self.state_dir / "pairs.parquet"
+
+    @property
+    def sj_dir(self) -> Path:
+        return self.state_dir / "sj"
+
+    @property
+    def ready(self) -> bool:
+        """True jika sudah ada minimal satu refresh yang selesai."""
+        return self._load_state()["parts"] > 0
+
+    def revision(self) -> str:
+        """Revisi state: berubah setiap refresh menambah part baru."""
+        state = self._load_state()
+        return f"incremental-{state['parts']}-{state['rows']}"
+
+    def master_items(self) -> pd.DataFrame:
+        """Agregat master yang diperbarui inkremental (sama dengan `aggregate_master_items` atas semua baris)."""
+        return pd.read_parquet(self.state_dir / "master_items.parquet")
+
+    def _load_state(self) -> dict:
+        path = self.state_dir / "state.json"
+        if not path.exists():
+            return {"parts": 0, "rows": 0, "max_created_on": None}
+        return json.loads(path.read_text())
+
+    def _read_optional(self, name: str, columns: List[str]) -> pd.DataFrame:
+        path = self.state_dir / name
+        if not path.exists():
+            return pd.DataFrame(columns=columns)
+        return pd.read_parquet(path)
+
+    def delta(self, fresh_df: pd.DataFrame, state: dict) -> pd.DataFrame:
+        """Baris `fresh_df` yang belum ada di state (lebih baru dari tanggal maksimum tersimpan)."""
+        if state["max_created_on"] is None:
+            return fresh_df
+        max_created_on = pd.Timestamp(state["max_created_on"])
+        newer = fresh_df[fresh_df['SJ_CREATED_ON'] > max_created_on]
+
+        # Baris bertanggal sama dengan maksimum bisa saja baru; bandingkan isinya dengan yang tersimpan
+        same_day = fresh_df[fresh_df['SJ_CREATED_ON'] == max_created_on]
+        if not same_day.empty:
+            stored = pd.read_parquet(self.sj_dir, filters=[("SJ_CREATED_ON", "==", max_created_on)])
+            known = set(_row_hashes(stored[same_day.columns]))
+            same_day = same_day[[h not in known for h in _row_hashes(same_day)]]
+        return pd.concat([same_day, newer])
+
+    def refresh(self, fresh_df: pd.DataFrame) -> dict:
+        """Proses baris baru dari `fresh_df` (Data SJ lengkap terbaru) dan perbarui seluruh state."""
+        started = time.perf_counter()
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        state = self._load_state()
+
+        delta = self.delta(fresh_df, state)
+        summary = {"new_rows": len(delta), "new_names": 0, "new_pairs": 0}
+        if delta.empty:
+            logger.info("Tidak ada baris SJ baru")
+            return summary
+
+        # 1) Append baris baru sebagai part baru
+        write_parquet(arrow_safe(delta.copy(), all_text=True), self.sj_dir / f"part-{state['parts']:05d}.parquet")
+
+        # 2) Perbarui agregat per barang dari baris baru saja
+        master = merge_master_items(
+            self._read_optional("master_items.parquet", []), aggregate_master_items(delta)
+        )
+
+        # 3) Item per nama: nama lama tetap di urutannya, nama baru ditambahkan di belakang
+        old_items = self._read_optional("items.parquet", ['NAMABRG'])
+        latest_items = items_from_master(master).set_index('NAMABRG')
+        old_names = old_items['NAMABRG'].tolist()
+        known = set(old_names)
+        new_names = [name for name in latest_items.index if name not in known]
+        items = latest_items.reindex(old_names + new_names).reset_index()
+
+        signatures_path = self.state_dir / "signatures.npy"
+        old_signatures = np.load(signatures_path) if old_names else np.empty((0, self.num_perm), dtype=np.uint64)
+        signatures = np.vstack([old_signatures, minhash_signatures(new_names, self.num_perm)])
+
+        # 4) Scoring hanya untuk pasangan yang melibatkan nama baru
+        names = items['NAMABRG'].tolist()
+        left, right = candidate_pairs(signatures, threshold=self.lsh_threshold, new_from=len(old_names))
+        scores = score_pairs(names, left, right, min_score=self.min_score, workers=self.workers)
+        keep = scores >= self.min_score
+        new_pairs = pd.DataFrame({
+            "SCORE": scores[keep],
+            "BARANG_A": items['NAMABRG'].to_numpy()[left[keep]],
+            "BARANG_B": items['NAMABRG'].to_numpy()[right[keep]],
+        })
+        old_pairs = self._read_optional("pairs.parquet", PAIR_DISPLAY_COLUMNS)[["SCORE", "BARANG_A", "BARANG_B"]]
+        non_empty = [df for df in (old_pairs, new_pairs) if not df.empty]
+        pairs = refresh_pair_details(pd.concat(non_empty, ignore_index=True) if non_empty else new_pairs, items)
+
+        write_parquet(master, self.state_dir / "master_items.parquet")
+        write_parquet(items, self.state_dir / "items.parquet")
+        np.save(signatures_path, signatures)
+        write_parquet(pairs, self.pairs_path)
+
+        max_created_on = delta['SJ_CREATED_ON'].max()
+        if state["max_created_on"] is not None and pd.notna(max_created_on):
+            max_created_on = max(max_created_on, pd.Timestamp(state["max_created_on"]))
+        summary.update(new_names=len(new_names), new_pairs=len(new_pairs), total_pairs=len(pairs),
+                       seconds=round(time.perf_counter() - started, 3))
+        state.update(
+            parts=state["parts"] + 1,
+            rows=state["rows"] + len(delta),
+            max_created_on=None if pd.isna(max_created_on) else pd.Timestamp(max_created_on).isoformat(),
+            last_refresh=summary,
+        )
+        (self.state_dir / "state.json").write_text(json.dumps(state, indent=2))
+        logger.info("Refresh selesai: %s", summary)
+        return summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Refresh inkremental Data SJ dan database kemiripan.")
+    parser.add_argument("--sj", required=True, help="Data SJ terbaru (.parquet atau .xlsx)")
+    parser.add_argument("--state-dir", default=".cache/incremental", help="Direktori state (default .cache/incremental)")
+    parser.add_argument("--min-score", type=float, default=90, help="Skor fuzz.ratio minimum (default 90)")
+    parser.add_argument("--lsh-threshold", type=float, default=0.4, help="Ambang Jaccard MinHash LSH (default 0.4)")
+    parser.add_argument("--num-perm", type=int, default=64, help="Jumlah permutasi MinHash (default 64)")
+    parser.add_argument("--workers", type=int, default=-1, help="Jumlah worker scoring (-1 = semua core)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    refresher = IncrementalRefresher(args.state_dir, min_score=args.min_score, lsh_threshold=args.lsh_threshold,
+                                     num_perm=args.num_perm, workers=args.workers)
+    refresher.refresh(read_sj(args.sj))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Backend query untuk Data SJ (riwayat pembelian).
+
+Dua implementasi dengan antarmuka yang sama:
+- `PandasSjBackend`: seluruh Data SJ di memori, filter lewat indeks nama.
+- `DuckDbSjBackend`: Data SJ di-ingest sekali ke file DuckDB lokal; filter nama, waktu,
+  kategori, dan agregasi master list dijalankan sebagai SQL sehingga hanya baris hasil
+  yang masuk ke memori worker.
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import duckdb
+import pandas as pd
+
+from indexes import NameRowIndex, aggregate_master_items
+from price_stats import STAT_COLUMNS, TIME_WINDOWS, build_price_stats, window_cutoff
+
+
+class PandasSjBackend:
+    """Data SJ sebagai DataFrame in-memory dengan indeks nama yang di-dictionary-encode."""
+
+    def __init__(self, sj_df: pd.DataFrame, revision: str = ""):
+        self.revision = revision
+        self.df = sj_df
+        self.columns: List[str] = list(sj_df.columns)
+        self.name_index = NameRowIndex(sj_df['NAMABRG'])
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def history(self, terms: Iterable[str], since: Optional[pd.Timestamp] = None,
+                categories: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Baris SJ yang NAMABRG-nya mengandung salah satu `terms`, opsional dibatasi waktu/kategori."""
+        result = self.df.iloc[self.name_index.search(terms)]
+        if since is not None and 'SJ_CREATED_ON' in result.columns:
+            result = result[result['SJ_CREATED_ON'] >= since]
+        if categories is not None and 'KATEGORI' in result.columns:
+            result = result[result['KATEGORI'].isin(list(categories))]
+        return result
+
+    def master_items(self) -> pd.DataFrame:
+        return aggregate_master_items(self.df)
+
+    def price_stats(self, now: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        return build_price_stats(self.df, now)
+
+
+class DuckDbSjBackend:
+    """Data SJ dalam file DuckDB lokal, satu file per revisi snapshot.
+
+    `parquet_path` boleh berupa satu file atau direktori berisi beberapa part (mis. `sj/` milik
+    `refresh.IncrementalRefresher`); part dibaca berurutan nama file.
+    Tabel `sj` menyimpan baris asli (urutan file dipertahankan lewat `_row`) beserta
+    `_name_id`, dan `sj_names` menyimpan nama unik yang sudah di-lowercase. Pencarian
+    nama dicocokkan ke `sj_names` dulu, baru diterapkan ke `sj`.
+    """
+
+    def __init__(self, parquet_path, revision: str, db_dir):
+        self.revision = revision
+        db_dir = Path(db_dir)
+        digest = hashlib.sha1(revision.encode()).hexdigest()[:16]
+        self.path = db_dir / f"sj_{digest}.duckdb"
+        if not self.path.exists():
+            self._ingest(Path(parquet_path), db_dir)
+        self.con = duckdb.connect(str(self.path), read_only=True)
+        self.columns: List[str] = [
+            row[0] for row in self.con.execute("DESCRIBE sj").fetchall() if not row[0].startswith('_')
+        ]
+
+    def _ingest(self, parquet_path: Path, db_dir: Path) -> None:
+        db_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        if tmp_path.exists():
+            tmp_path.unlink()
+        with duckdb.connect(str(tmp_path)) as con:
+            source = str(parquet_path / "*.parquet" if parquet_path.is_dir() else parquet_path).replace("'", "''")
+            con.execute(f"""
+                CREATE TEMP VIEW raw AS
+                SELECT * EXCLUDE (filename, file_row_number),
+                       row_number() OVER (ORDER BY filename, file_row_number) - 1 AS _row
+                FROM read_parquet('{source}', filename = true, file_row_number = true, union_by_name = true)
+            """)
+            con.execute("""
+                CREATE TABLE sj_names AS
+                SELECT CAST(row_number() OVER (ORDER BY NAMABRG) - 1 AS INTEGER) AS _name_id,
+                       NAMABRG,
+                       lower(CAST(NAMABRG AS VARCHAR)) AS name_folded
+                FROM (SELECT DISTINCT NAMABRG FROM raw WHERE NAMABRG IS NOT NULL)
+            """)
+            con.execute("""
+                CREATE TABLE sj AS
+                SELECT raw.*, n._name_id
+                FROM raw LEFT JOIN sj_names n ON raw.NAMABRG = n.NAMABRG
+                ORDER BY raw._row
+            """)
+        os.replace(tmp_path, self.path)
+        # Bersihkan file revisi lama; koneksi yang masih terbuka tetap bisa membaca
+        for old in db_dir.glob("sj_*.duckdb"):
+            if old != self.path:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+
+    def __len__(self) -> int:
+        return self.con.cursor().execute("SELECT count(*) FROM sj").fetchone()[0]
+
+    def history(self, terms: Iterable[str], since: Optional[pd.Timestamp] = None,
+                categories: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Sama seperti `PandasSjBackend.history`, tetapi seluruh filter dijalankan di DuckDB."""
+        folded = [str(term).lower() for term in dict.fromkeys(terms)]
+        where = ["_name_id IN (SELECT n._name_id FROM sj_names n, unnest(?) t(term) "
+                 "WHERE contains(n.name_folded, t.term))"]
+        params: list = [folded]
+        if since is not None and 'SJ_CREATED_ON' in self.columns:
+            where.append("SJ_CREATED_ON >= ?")
+            params.append(pd.Timestamp(since).to_pydatetime())
+        if categories is not None and 'KATEGORI' in self.columns:
+            where.append("list_contains(?, CAST(KATEGORI AS VARCHAR))")
+            params.append([str(c) for c in categories])
+        sql = f"SELECT * EXCLUDE (_row, _name_id) FROM sj WHERE {' AND '.join(where)} ORDER BY _row"
+        return self.con.cursor().execute(sql, params).df()
+
+    def master_items(self) -> pd.DataFrame:
+        """Agregasi master list (setara `aggregate_master_items`) dalam SQL."""
+        return self.con.cursor().execute("""
+            SELECT NAMABRG, KODEBARANG, SATUAN,
+                   arg_max(HARGARATA, SJ_CREATED_ON) FILTER (WHERE HARGARATA IS NOT NULL) AS HARGARATA,
+                   arg_max(KATEGORI, SJ_CREATED_ON) FILTER (WHERE KATEGORI IS NOT NULL) AS KATEGORI,
+                   max(SJ_CREATED_ON) AS Permintaan_Terakhir,
+                   min(SJ_CREATED_ON) AS Permintaan_Awal
+            FROM sj
+            WHERE NAMABRG IS NOT NULL AND KODEBARANG IS NOT NULL AND SATUAN IS NOT NULL
+            GROUP BY NAMABRG, KODEBARANG, SATUAN
+            ORDER BY NAMABRG, KODEBARANG, SATUAN
+        """).df()
+
+    def price_stats(self, now: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """Statistik harga per periode (setara `build_price_stats`) dalam SQL, satu SELECT per periode."""
+        selects, params = [], []
+        for period in TIME_WINDOWS:
+            cutoff = window_cutoff(period, now)
+            where = "KODEBARANG IS NOT NULL AND SATUAN IS NOT NULL"
+            params.append(period)
+            if cutoff is not None:
+                where += " AND SJ_CREATED_ON >= ?"
+                params.append(cutoff.to_pydatetime())
+            selects.append(f"""
+                SELECT CAST(KODEBARANG AS VARCHAR) AS KODEBARANG, CAST(SATUAN AS VARCHAR) AS SATUAN,
+                       CAST(? AS VARCHAR) AS PERIODE,
+                       last(CAST(HARGARATA AS DOUBLE) ORDER BY SJ_CREATED_ON NULLS FIRST, _row)
+                           FILTER (WHERE HARGARATA IS NOT NULL) AS HARGA_TERAKHIR,
+                       median(CAST(HARGARATA AS DOUBLE)) AS HARGA_MEDIAN,
+                       min(CAST(HARGARATA AS DOUBLE)) AS HARGA_MIN,
+                       max(CAST(HARGARATA AS DOUBLE)) AS HARGA_MAX,
+                       quantile_cont(CAST(HARGARATA AS DOUBLE), 0.25) AS HARGA_Q1,
+                       quantile_cont(CAST(HARGARATA AS DOUBLE), 0.75) AS HARGA_Q3,
+                       HARGA_Q3 - HARGA_Q1 AS HARGA_IQR,
+                       count(*) AS JUMLAH_PERMINTAAN,
+                       max(SJ_CREATED_ON) AS PERMINTAAN_TERAKHIR
+                FROM sj WHERE {where}
+                GROUP BY 1, 2""")
+        sql = " UNION ALL ".join(selects) + " ORDER BY PERIODE, KODEBARANG, SATUAN"
+        return self.con.cursor().execute(sql, params).df()[STAT_COLUMNS]
@@ -0,0 +1,156 @@
+"""Data sintetis untuk benchmark dan tests: barang, Data SJ, dan database kemiripan.
+
+Nama barang berbahasa Indonesia beserta variasi penulisannya (spasi ganda, singkatan,
+salah ketik, akhiran), dengan format kolom yang sama seperti file di Drive.
+"""
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+ITEM_TYPES = [
+    ("BAUT HEX", "MEKANIKAL", "PCS"), ("MUR", "MEKANIKAL", "PCS"), ("RING PLAT", "MEKANIKAL", "PCS"),
+    ("BEARING", "MEKANIKAL", "PCS"), ("V-BELT", "MEKANIKAL", "PCS"), ("MATA BOR", "MEKANIKAL", "PCS"),
+    ("KABEL NYA", "ELEKTRIKAL", "MTR"), ("KABEL NYY", "ELEKTRIKAL", "MTR"), ("LAMPU LED", "ELEKTRIKAL", "PCS"),
+    ("STOP KONTAK", "ELEKTRIKAL", "PCS"), ("SAKLAR", "ELEKTRIKAL", "PCS"), ("MCB", "ELEKTRIKAL", "PCS"),
+    ("PIPA PVC", "SIPIL", "BTG"), ("PIPA GALVANIS", "SIPIL", "BTG"), ("SEMEN PORTLAND", "SIPIL", "SAK"),
+    ("BESI BETON", "SIPIL", "BTG"), ("CAT TEMBOK", "SIPIL", "PAIL"), ("KAWAT BENDRAT", "SIPIL", "KG"),
+    ("OLI MESIN", "PELUMAS", "LTR"), ("OLI HIDROLIK", "PELUMAS", "LTR"), ("GREASE", "PELUMAS", "KG"),
+    ("FILTER OLI", "SPAREPART", "PCS"), ("FILTER UDARA", "SPAREPART", "PCS"), ("FILTER SOLAR", "SPAREPART", "PCS"),
+    ("SARUNG TANGAN", "K3", "PSG"), ("SEPATU SAFETY", "K3", "PSG"), ("HELM SAFETY", "K3", "PCS"),
+    ("KERTAS HVS", "ATK", "RIM"), ("TINTA PRINTER", "ATK", "BTL"), ("LAKBAN", "ATK", "ROLL"),
+]
+SPECS = ["M10X30", "M12X40", "M16", "2.5MM", "4X10", "1/2 INCH", "2 INCH", "18W", "50KG", "A4 70GSM",
+         "SAE 40", "ISO 68", "6205 ZZ", "B-52", "16A", "3/4 INCH", "D10", "D13", "5 KG", "20 LTR"]
+SIZE_UNITS = ["MM", "CM", "W", "KG", "LTR", " INCH", "A", "V", "GR"]
+BRANDS = ["", "", "PHILIPS", "SUPREME", "WAVIN", "DULUX", "TIGA RODA", "SHELL", "BOSCH", "SKF", "3M", "SIDU"]
+ABBREVIATIONS = {"INCH": "INC", "LAMPU": "LMP", "KABEL": "KBL", "SARUNG": "SRG", "SEPATU": "SPT", "FILTER": "FLT"}
+
+
+def _variant(name: str, rng: np.random.Generator) -> str:
+    """Satu variasi penulisan: spasi ganda, titik, singkatan, salah ketik, atau akhiran."""
+    kind = rng.integers(6)
+    if kind == 0:
+        return name.replace(" ", "  ", 1)
+    if kind == 1:
+        pos = int(rng.integers(1, len(name)))
+        return name[:pos] + "." + name[pos:]
+    if kind == 2:
+        for word, short in ABBREVIATIONS.items():
+            if word in name:
+                return name.replace(word, short)
+        return name + " SS"
+    if kind == 3 and len(name) > 4:
+        pos = int(rng.integers(1, len(name) - 1))
+        return name[:pos] + name[pos + 1] + name[pos] + name[pos + 2:]
+    if kind == 4:
+        return name + " (BARU)"
+    return name + " SS"
+
+
+def synthetic_items(n_names: int, seed: int = 0) -> pd.DataFrame:
+    """Daftar barang unik: nama, kode, satuan, kategori, harga dasar, dan id keluarga variasinya."""
+    rng = np.random.default_rng(seed)
+    names: Dict[str, int] = {}
+    rows = []
+    family = 0
+    while len(rows) < n_names:
+        item_type, category, unit = ITEM_TYPES[rng.integers(len(ITEM_TYPES))]
+        brand = BRANDS[rng.integers(len(BRANDS))]
+        if rng.random() < 0.5:
+            spec = SPECS[rng.integers(len(SPECS))]
+        else:
+            spec = f"{rng.integers(1, 500)}{SIZE_UNITS[rng.integers(len(SIZE_UNITS))]}"
+        base = " ".join(part for part in (item_type, spec, brand) if part)
+        price = float(np.round(rng.lognormal(11, 1.2), -2))
+        members = [base] + [_variant(base, rng) for _ in range(int(rng.integers(0, 4)))]
+        for name in members:
+            if name in names or len(rows) >= n_names:
+                continue
+            names[name] = len(rows)
+            rows.append((name, f"K{len(rows):07d}", unit, category, price * rng.uniform(0.8, 1.25), family))
+        family += 1
+    return pd.DataFrame(rows, columns=["NAMABRG", "KODEBARANG", "SATUAN", "KATEGORI", "HARGA", "FAMILY"])
+
+
+def synthetic_sj(items: pd.DataFrame, n_rows: int, seed: int = 1) -> pd.DataFrame:
+    """Baris Data SJ: nama diambil acak (distribusi miring), harga berfluktuasi, dua tahun terakhir."""
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, len(items) + 1) ** 0.8
+    picks = rng.choice(len(items), size=n_rows, p=weights / weights.sum())
+    picked = items.iloc[picks]
+    price = np.round(picked["HARGA"].to_numpy() * rng.uniform(0.9, 1.15, n_rows), -2)
+    qty = rng.integers(1, 50, n_rows)
+    created = pd.Timestamp.now().normalize() - pd.to_timedelta(rng.integers(0, 730, n_rows), unit="D")
+    return pd.DataFrame({
+        "NAMABRG": picked["NAMABRG"].to_numpy(),
+        "KODEBARANG": picked["KODEBARANG"].to_numpy(),
+        "SATUAN": picked["SATUAN"].to_numpy(),
+        "KATEGORI": picked["KATEGORI"].to_numpy(),
+        # Sebagian harga berupa teks "Rp 12,000" seperti export aslinya
+        "HARGARATA": np.where(rng.random(n_rows) < 0.3, [f"Rp {p:,.0f}" for p in price], price.astype(object)),
+        "TOTALHARGA": price * qty,
+        "JUMLAH": qty,
+        "JMLDISETUJUI": qty,
+        "JML_DITERIMA": qty,
+        "SJ_CREATED_ON": created,
+    })
+
+
+def synthetic_pairs(items: pd.DataFrame, n_pairs: int, seed: int = 2) -> pd.DataFrame:
+    """Tabel pasangan format Drive ("BARANG A", "SELISIH HARGA (%)", ...) dari nama-nama sekeluarga.
+
+    Pasangan diambil acak (boleh berulang bila `n_pairs` melebihi jumlah pasangan unik),
+    skornya `fuzz.ratio` sungguhan.
+    """
+    rng = np.random.default_rng(seed)
+    family = items["FAMILY"].to_numpy()
+    order = np.argsort(family, kind="stable")
+    starts = np.searchsorted(family[order], family[order], side="left")
+    ends = np.searchsorted(family[order], family[order], side="right")
+    # Sisi kiri diambil dari keluarga beranggota >= 2, sisi kanan anggota lain dari keluarga yang sama
+    pos = np.empty(len(items), dtype=np.int64)
+    pos[order] = np.arange(len(items))
+    eligible = np.flatnonzero(ends[pos] - starts[pos] > 1)
+    left = eligible[rng.integers(len(eligible), size=n_pairs)]
+    lo, size = starts[pos[left]], ends[pos[left]] - starts[pos[left]]
+    # Geser 1..size-1 dari posisi kiri di dalam keluarganya sehingga tidak pernah memasangkan nama dengan dirinya
+    offset = (pos[left] - lo + rng.integers(1, 1 << 30, n_pairs) % (size - 1) + 1) % size
+    right = order[lo + offset]
+
+    names = items["NAMABRG"].to_numpy()
+    score = process.cpdist(names[left].tolist(), names[right].tolist(), scorer=fuzz.ratio, dtype=np.float64, workers=-1)
+    price_a, price_b = items["HARGA"].to_numpy()[left], items["HARGA"].to_numpy()[right]
+    return pd.DataFrame({
+        "SCORE": np.round(score, 2),
+        "SELISIH HARGA (%)": np.abs(price_a - price_b) / np.fmin(price_a, price_b) * 100,
+        "BARANG A": names[left], "HARGA A": price_a, "SATUAN": items["SATUAN"].to_numpy()[left],
+        "KODE A": items["KODEBARANG"].to_numpy()[left], "KATEGORI A": items["KATEGORI"].to_numpy()[left],
+        "BARANG B": names[right], "HARGA B": price_b,
+        "KODE B": items["KODEBARANG"].to_numpy()[right], "KATEGORI B": items["KATEGORI"].to_numpy()[right],
+    })
+
+
+def write_xlsx(df: pd.DataFrame, path: Path) -> None:
+    """Tulis Excel satu sheet dengan openpyxl write-only (jauh lebih cepat dari `to_excel`)."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        sheet.append([None if isinstance(v, float) and np.isnan(v) else
+                      v.to_pydatetime() if isinstance(v, pd.Timestamp) else v for v in row])
+    workbook.save(path)
+
+
+def sample_queries(items: pd.DataFrame, n: int, seed: int = 3) -> List[str]:
+    """Query realistis: potongan nama barang (huruf kecil) dan nama lengkap dengan salah ketik."""
+    rng = np.random.default_rng(seed)
+    names = items["NAMABRG"].to_numpy()[rng.integers(len(items), size=n)]
+    queries = []
+    for i, name in enumerate(names):
+        words = name.split()
+        queries.append(" ".join(words[:2]).lower() if i % 2 == 0 else _variant(name, rng))
+    return queries
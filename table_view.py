@@ -0,0 +1,161 @@
+"""Paginasi tampilan hasil.
+
+- Tabel "Hasil Filter": potongan Arrow zero-copy + format kolom hanya untuk halaman yang tampil.
+- "Perbandingan Side-by-Side": kartu per halaman dalam satu blok HTML, dengan highlight diff yang di-memoize.
+"""
+import html
+import math
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from rapidfuzz.distance import Levenshtein
+
+PAIR_DISPLAY_COLUMNS = [
+    "SCORE", "SELISIH_HARGA_PERSEN", "BARANG_A", "HARGA_A", "SATUAN", "KODE_A", "KATEGORI_A",
+    "BARANG_B", "HARGA_B", "KODE_B", "KATEGORI_B"
+]
+
+PAIR_FORMATS = {
+    'HARGA_A': "Rp {:,.0f}",
+    'HARGA_B': "Rp {:,.0f}",
+    'SCORE': '{:.2f}',
+    'SELISIH_HARGA_PERSEN': '{:.2f}%'
+}
+
+
+def to_arrow(df: pd.DataFrame, columns=None) -> pa.Table:
+    """Simpan hasil filter sebagai tabel Arrow agar tiap halaman bisa dipotong tanpa salinan."""
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def page_count(n_rows: int, page_size: int) -> int:
+    return max(1, math.ceil(n_rows / page_size))
+
+
+def page_bounds(n_rows: int, page_size: int, page: int) -> Tuple[int, int]:
+    """Rentang [start, stop) untuk halaman `page` (mulai dari 1), dibatasi ke jumlah halaman."""
+    page = min(max(1, page), page_count(n_rows, page_size))
+    start = (page - 1) * page_size
+    return start, min(start + page_size, n_rows)
+
+
+def page_slice(table: pa.Table, page_size: int, page: int, reverse: bool = False) -> pa.Table:
+    """Potongan tabel untuk satu halaman; `reverse` membaca tabel dari belakang."""
+    start, stop = page_bounds(table.num_rows, page_size, page)
+    if not reverse:
+        return table.slice(start, stop - start)
+    # Urutan terbalik: ambil potongan dari ujung lalu balik hanya baris halaman ini
+    chunk = table.slice(table.num_rows - stop, stop - start)
+    return chunk.take(np.arange(chunk.num_rows - 1, -1, -1))
+
+
+def format_columns(df: pd.DataFrame, formats: Dict[str, str]) -> pd.DataFrame:
+    """Format kolom angka menjadi teks per kolom (nilai kosong jadi string kosong)."""
+    df = df.copy()
+    for col, fmt in formats.items():
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col], errors='coerce')
+        notna = values.notna().to_numpy()
+        formatted = np.full(len(values), "", dtype=object)
+        formatted[notna] = [fmt.format(v) for v in values.to_numpy()[notna]]
+        df[col] = formatted
+    return df
+
+
+# --- Fungsi untuk menyorot perbedaan teks ---
+STYLE_DEL = 'style="background-color: #ffcdd2; padding: 2px; border-radius: 3px;"'
+STYLE_INS = 'style="background-color: #c8e6c9; padding: 2px; border-radius: 3px;"'
+
+
+def _join_segments(segments: List[Tuple[bool, str]], style: str) -> str:
+    """Gabungkan segmen (berubah?, teks); segmen berubah yang berurutan dibungkus satu <span>."""
+    out, changed = [], []
+    for is_changed, text in segments:
+        if is_changed:
+            changed.append(text)
+            continue
+        if changed:
+            out.append(f'<span {style}>{html.escape("".join(changed))}</span>')
+            changed = []
+        out.append(html.escape(text))
+    if changed:
+        out.append(f'<span {style}>{html.escape("".join(changed))}</span>')
+    return "".join(out)
+
+
+@lru_cache(maxsize=16384)
+def highlight_diff(text1, text2) -> Tuple[str, str]:
+    """HTML kedua nama dengan bagian yang berbeda disorot (opcode Levenshtein dari RapidFuzz)."""
+    text1, text2 = str(text1), str(text2)
+    segments1: List[Tuple[bool, str]] = []
+    segments2: List[Tuple[bool, str]] = []
+    for opcode, i1, i2, j1, j2 in Levenshtein.opcodes(text1, text2):
+        if opcode == 'equal':
+            segments1.append((False, text1[i1:i2]))
+            segments2.append((False, text2[j1:j2]))
+        elif opcode == 'replace':
+            segments1.append((True, text1[i1:i2]))
+            segments2.append((True, text2[j1:j2]))
+        elif opcode == 'delete':
+            segments1.append((True, text1[i1:i2]))
+        elif opcode == 'insert':
+            segments2.append((True, text2[j1:j2]))
+    return _join_segments(segments1, STYLE_DEL), _join_segments(segments2, STYLE_INS)
+
+
+def _format_price(price) -> str:
+    if pd.isna(price):
+        return ""
+    return f"<p><b>Harga:</b> Rp {int(price):,}</p>".replace(',', '.')
+
+
+def _item_card(title: str, name_html: str, price, unit, code, category) -> str:
+    return (
+        f"<div><h4>{title}</h4>"
+        f"<p><b>Nama:</b> {name_html}</p>"
+        f"{_format_price(price)}"
+        f"<p><b>Satuan:</b> {html.escape(str(unit))}</p>"
+        f"<p><b>Kode:</b> {html.escape(str(code))}</p>"
+        f"<p><b>Kategori:</b> {html.escape(str(category))}</p></div>"
+    )
+
+
+def render_comparison_cards(pairs: pd.DataFrame, primary_item: str) -> str:
+    """Satu blok HTML berisi kartu perbandingan side-by-side untuk baris-baris di `pairs`.
+
+    Sisi yang namanya memuat `primary_item` ditampilkan sebagai "Barang Utama".
+    """
+    if pairs.empty:
+        return ""
+    is_a_primary = pairs['BARANG_A'].astype(str).str.upper().str.contains(
+        str(primary_item).upper(), regex=False
+    ).to_numpy()
+
+    def side(primary_col: str, other_col: str) -> Tuple[np.ndarray, np.ndarray]:
+        primary_vals = pairs[primary_col].to_numpy()
+        other_vals = pairs[other_col].to_numpy()
+        return np.where(is_a_primary, primary_vals, other_vals), np.where(is_a_primary, other_vals, primary_vals)
+
+    names_a, names_b = side('BARANG_A', 'BARANG_B')
+    prices_a, prices_b = side('HARGA_A', 'HARGA_B')
+    codes_a, codes_b = side('KODE_A', 'KODE_B')
+    cats_a, cats_b = side('KATEGORI_A', 'KATEGORI_B')
+    units = pairs['SATUAN'].to_numpy()
+
+    cards = []
+    for i in range(len(pairs)):
+        highlighted_a, highlighted_b = highlight_diff(names_a[i], names_b[i])
+        cards.append(
+            '<div style="display: grid; grid-template-columns: 1fr 1fr; gap: 1rem; '
+            'border-top: 1px solid rgba(49, 51, 63, 0.2); padding: 0.75rem 0;">'
+            + _item_card("Barang Utama", highlighted_a, prices_a[i], units[i], codes_a[i], cats_a[i])
+            + _item_card("Pasangan Mirip", highlighted_b, prices_b[i], units[i], codes_b[i], cats_b[i])
+            + '</div>'
+        )
+    return "".join(cards)
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from indexes import MasterIndex, SimilarityGraph, find_similar_items_bulk
+from price_stats import PriceStats, build_price_stats
+
+
+def test_graph_expand_follows_indirect_pairs():
+    graph = SimilarityGraph(pd.Series(['A', 'B', 'X', None]), pd.Series(['B', 'C', 'Y', 'Z']))
+    assert sorted(graph.expand(['C'])) == ['A', 'B', 'C']
+    assert sorted(graph.expand(['Y', 'TIDAK ADA'])) == ['TIDAK ADA', 'X', 'Y']
+    assert graph.expand(['Z']) == ['Z']
+
+
+def test_graph_search_pairs_matches_either_side():
+    graph = SimilarityGraph(pd.Series(['KABEL A', 'BAUT M10']), pd.Series(['KABEL B', 'MUR KABEL']))
+    assert graph.search_pairs('kabel').tolist() == [0, 1]
+    assert graph.search_pairs('baut').tolist() == [1]
+
+
+def bulk_results():
+    sj = pd.DataFrame({
+        'NAMABRG': ['BAUT HEX M10', 'BAUT HEX M10', 'KABEL NYA 2.5MM'],
+        'KODEBARANG': ['K1', 'K1', 'K2'],
+        'SATUAN': ['PCS', 'PCS', 'MTR'],
+        'HARGARATA': [1000.0, 1100.0, 5000.0],
+        'KATEGORI': ['MEKANIKAL', 'MEKANIKAL', 'ELEKTRIKAL'],
+        'SJ_CREATED_ON': pd.to_datetime(['2026-01-01', '2026-02-01', '2026-03-01']),
+    })
+    stats = PriceStats(build_price_stats(sj, pd.Timestamp('2026-04-01')))
+    names = ['baut hex m10', 'zzzz qqq', 'Baut Hex M10 ', 'baut hex m10']
+    return stats.annotate_items(find_similar_items_bulk(names, MasterIndex.from_sj(sj), top_k=1, workers=1))
+
+
+def test_bulk_keeps_input_text_and_duplicates():
+    results = bulk_results()
+    assert results['No'].tolist() == [1, 2, 3, 4]
+    assert results['Nama Input'].tolist() == ['baut hex m10', 'zzzz qqq', 'Baut Hex M10 ', 'baut hex m10']
+    assert results['Barang Mirip di Data SJ'].tolist() == ['BAUT HEX M10', None, 'BAUT HEX M10', 'BAUT HEX M10']
+
+
+def test_bulk_unmatched_rows_have_blank_annotations():
+    results = bulk_results()
+    assert str(results['Jumlah Permintaan'].dtype) == 'Int64'
+    assert results['Jumlah Permintaan'].tolist()[::2] == [2, 2]
+    unmatched = results.iloc[1]
+    assert pd.isna(unmatched['Jumlah Permintaan'])
+    assert pd.isna(unmatched['Harga Anomali'])
+    assert pd.isna(unmatched['Harga Median'])
+    assert not results['Harga Anomali'].iloc[0]
+    csv_row = results.to_csv(index=False).splitlines()[2]
+    assert csv_row.startswith('2,zzzz qqq,') and csv_row.endswith(',,,')
@@ -0,0 +1,65 @@
+import threading
+import tracemalloc
+
+import pytest
+
+import instrumentation
+from instrumentation import active_trace, stage, start_run
+
+
+@pytest.fixture(autouse=True)
+def _reset_tracing():
+    yield
+    instrumentation._memory_runs.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _in_thread(func):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_tracing_stops_when_tracking_run_is_closed():
+    trace = start_run("A", track_memory=True)
+    assert tracemalloc.is_tracing()
+    with stage("alloc"):
+        _ = [0] * 100_000
+    assert trace.stages[0]["mem_delta_mb"] > 0
+    trace.log_summary()
+    assert not tracemalloc.is_tracing()
+
+
+def test_other_session_does_not_keep_tracing_alive():
+    # Sesi A menyalakan pengukuran lalu menutup tab (tidak pernah rerun lagi)
+    trace_a = _in_thread(lambda: start_run("A", track_memory=True))
+    trace_a.log_summary()
+    start_run("B", track_memory=False)
+    assert not tracemalloc.is_tracing()
+
+
+def test_unclosed_tracking_run_expires(monkeypatch):
+    _in_thread(lambda: start_run("A", track_memory=True))  # rerun terhenti sebelum log_summary
+    assert tracemalloc.is_tracing()
+    monkeypatch.setattr(instrumentation, "MEMORY_RUN_TIMEOUT", 0)
+    start_run("B", track_memory=False)
+    assert not tracemalloc.is_tracing()
+
+
+def test_concurrent_tracking_runs_share_tracing():
+    trace_a = _in_thread(lambda: start_run("A", track_memory=True))
+    trace_b = start_run("B", track_memory=True)
+    trace_a.log_summary()
+    assert tracemalloc.is_tracing()
+    trace_b.log_summary()
+    assert not tracemalloc.is_tracing()
+
+
+def test_new_run_on_same_thread_closes_previous():
+    first = start_run("A", track_memory=True)
+    second = start_run("A", track_memory=False)
+    assert first.finished and active_trace() is second
+    assert not tracemalloc.is_tracing()
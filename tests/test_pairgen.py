@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from data_store import normalize_pairs
+from pairgen import assemble_pairs, price_gap_percent
+from table_view import PAIR_DISPLAY_COLUMNS
+
+
+def test_price_gap_is_nan_for_missing_or_zero_price():
+    gap = price_gap_percent([100.0, np.nan, 0.0, 150.0], [150.0, 100.0, 100.0, 100.0])
+    np.testing.assert_allclose(gap, [50.0, np.nan, np.nan, 50.0])
+
+
+def test_pairs_without_price_survive_normalize():
+    items = pd.DataFrame({
+        'NAMABRG': ['KABEL NYA 1.5', 'KABEL NYA 1,5', 'KABEL NYA 2.5'],
+        'KODEBARANG': ['K1', 'K2', 'K3'],
+        'SATUAN': ['ROL', 'ROL', 'ROL'],
+        'KATEGORI': ['LISTRIK'] * 3,
+        'HARGARATA': [250000.0, np.nan, 0.0],
+    })
+    pairs = assemble_pairs(items, np.array([0, 0]), np.array([1, 2]), np.array([96.0, 92.0]))
+    assert list(pairs.columns) == PAIR_DISPLAY_COLUMNS
+
+    normalized = normalize_pairs(pairs)
+    assert len(normalized) == 2
+    assert normalized['SELISIH_HARGA_PERSEN'].isna().all()
+
+
+def test_normalize_drops_rows_without_score():
+    db_df = pd.DataFrame({'SCORE': ['95', 'x'], 'SELISIH HARGA (%)': [None, '10'],
+                          'BARANG A': ['A', 'B'], 'BARANG B': ['C', 'D']})
+    normalized = normalize_pairs(db_df)
+    assert normalized['BARANG_A'].tolist() == ['A']
@@ -0,0 +1,41 @@
+import threading
+from pathlib import Path
+
+import prefetch
+from prefetch import Prefetcher, activate
+
+
+class FakeStore:
+    """Pengganti `SnapshotStore`: revisi tetap, hitung panggilan `ensure`."""
+
+    def __init__(self):
+        self.calls = 0
+        self.called = threading.Event()
+
+    def ensure(self, file_id, sheet_name=None):
+        self.calls += 1
+        self.called.set()
+        return Path(f"/snap/{file_id}.parquet"), "rev-1"
+
+
+def test_activate_stops_previous_prefetcher(monkeypatch):
+    monkeypatch.setattr(prefetch, "_active", None)
+    old_store, new_store = FakeStore(), FakeStore()
+    old = activate(Prefetcher(old_store, {"sj": ("sj-id", None)}, interval=0.01))
+    assert old_store.called.wait(2)
+
+    new = activate(Prefetcher(new_store, {"sj": ("sj-id", None)}, interval=60))
+    old._thread.join(2)
+    assert not old._thread.is_alive()
+    assert new_store.called.wait(2)
+    assert new.current("sj") == (Path("/snap/sj-id.parquet"), "rev-1")
+    new.stop()
+
+
+def test_activate_without_sources_does_not_start(monkeypatch):
+    monkeypatch.setattr(prefetch, "_active", None)
+    running = activate(Prefetcher(FakeStore(), {"pairs": ("db-id", None)}, interval=60))
+    idle = activate(Prefetcher(FakeStore(), {}, interval=60))
+    assert idle._thread is None
+    running._thread.join(2)
+    assert not running._thread.is_alive()
@@ -0,0 +1,72 @@
+import io
+
+import openpyxl
+
+from data_source import read_name_list
+
+
+def _csv(text: str) -> io.BytesIO:
+    return io.BytesIO(text.encode("utf-8"))
+
+
+def test_single_column_names_with_spaces_are_not_split():
+    text = "NAMABRG\nBAUT HEX M10\nMUR M10\nKABEL NYA 2X1.5\n"
+    assert read_name_list(_csv(text), "daftar.csv") == ["BAUT HEX M10", "MUR M10", "KABEL NYA 2X1.5"]
+
+
+def test_single_row_single_column():
+    assert read_name_list(_csv("NAMABRG\nBAUT HEX M10\n"), "daftar.csv") == ["BAUT HEX M10"]
+
+
+def test_single_column_names_with_commas_are_not_split():
+    names = [f"KABEL NYA {i}X1,5" for i in range(1, 40)]
+    text = "NAMABRG\n" + "\n".join(names) + "\n"
+    assert read_name_list(_csv(text), "daftar.csv") == names
+
+
+def test_quoted_names_with_commas_in_comma_separated_file():
+    text = 'NAMABRG,SATUAN\n"KABEL NYA 2X1,5",ROLL\n"BAUT HEX M10, GALVANIS",PCS\n'
+    assert read_name_list(_csv(text), "daftar.csv") == ["KABEL NYA 2X1,5", "BAUT HEX M10, GALVANIS"]
+
+
+def test_semicolon_separated_picks_name_column():
+    text = "SATUAN;Nama Barang\nPCS;BAUT HEX M10\nROLL;KABEL NYA 2X1.5\n"
+    assert read_name_list(_csv(text), "daftar.csv") == ["BAUT HEX M10", "KABEL NYA 2X1.5"]
+
+
+def test_utf8_bom_and_blank_cells_are_dropped():
+    text = "﻿NAMABRG\nBAUT HEX M10\n\n  \nMUR M10\n"
+    assert read_name_list(_csv(text), "daftar.csv") == ["BAUT HEX M10", "MUR M10"]
+
+
+def test_xlsx_falls_back_to_first_column():
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Barang", "Qty"])
+    ws.append(["BAUT HEX M10", 3])
+    ws.append([None, 4])
+    ws.append(["MUR M10", 5])
+    fh = io.BytesIO()
+    wb.save(fh)
+    fh.seek(0)
+    assert read_name_list(fh, "daftar.xlsx") == ["BAUT HEX M10", "MUR M10"]
+
+
+def test_headerless_csv_keeps_first_name():
+    assert read_name_list(_csv("BAUT HEX M10\nMUR M10\n"), "daftar.csv") == ["BAUT HEX M10", "MUR M10"]
+
+
+def test_headerless_csv_with_extra_columns_uses_first_column():
+    text = "BAUT HEX M10;PCS\nMUR M10;PCS\n"
+    assert read_name_list(_csv(text), "daftar.csv") == ["BAUT HEX M10", "MUR M10"]
+
+
+def test_headerless_xlsx_keeps_first_name():
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["BAUT HEX M10"])
+    ws.append(["MUR M10"])
+    fh = io.BytesIO()
+    wb.save(fh)
+    fh.seek(0)
+    assert read_name_list(fh, "daftar.xlsx") == ["BAUT HEX M10", "MUR M10"]
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import SjData
+from indexes import aggregate_master_items
+from pairgen import read_sj
+from refresh import IncrementalRefresher
+from sj_backend import DuckDbSjBackend, PandasSjBackend
+from synthetic import write_xlsx
+
+KEYS = ['NAMABRG', 'KODEBARANG', 'SATUAN']
+
+
+def sj_frame() -> pd.DataFrame:
+    names = ['KERTAS HVS A4', 'KERTAS HVS A4 80GR', 'PULPEN HITAM', 'PULPEN BIRU', 'TINTA PRINTER HITAM']
+    rows = []
+    for day in range(12):
+        name = names[day % len(names)]
+        rows.append({
+            'NAMABRG': name,
+            'KODEBARANG': f"K{names.index(name):03d}",
+            'SATUAN': 'PCS',
+            'HARGARATA': 1000.0 + 10 * day,
+            'KATEGORI': 'ATK' if day < 8 else 'KANTOR',
+            'SJ_CREATED_ON': pd.Timestamp("2026-01-01") + pd.Timedelta(days=day),
+        })
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def refreshed(tmp_path):
+    """State hasil dua refresh: 8 baris pertama, lalu seluruh data (4 baris baru)."""
+    sj = sj_frame()
+    refresher = IncrementalRefresher(tmp_path / "state", workers=1)
+    refresher.refresh(sj.iloc[:8])
+    refresher.refresh(sj)
+    return refresher, sj
+
+
+def sort_master(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(KEYS).reset_index(drop=True)[
+        KEYS + ['HARGARATA', 'KATEGORI', 'Permintaan_Terakhir', 'Permintaan_Awal']
+    ]
+
+
+def test_merged_master_matches_full_aggregate(refreshed):
+    refresher, sj = refreshed
+    pd.testing.assert_frame_equal(sort_master(refresher.master_items()), sort_master(aggregate_master_items(sj)),
+                                  check_dtype=False)
+
+
+def test_revision_changes_per_refresh(refreshed):
+    refresher, sj = refreshed
+    before = refresher.revision()
+    assert refresher.refresh(sj)["new_rows"] == 0
+    assert refresher.revision() == before
+    assert refresher.ready
+
+
+@pytest.mark.parametrize("backend", ["pandas", "duckdb"])
+def test_sj_data_reads_parts_in_order(refreshed, tmp_path, backend):
+    refresher, sj = refreshed
+    revision = refresher.revision()
+    if backend == "duckdb":
+        sj_backend = DuckDbSjBackend(refresher.sj_dir, revision, tmp_path / "duckdb")
+    else:
+        sj_backend = PandasSjBackend(pd.read_parquet(refresher.sj_dir), revision)
+    data = SjData(sj_backend, refresher.master_items())
+
+    assert len(sj_backend) == len(sj)
+    history = data.history(['PULPEN'], 'Tampilkan Semua', pd.Timestamp("2026-02-01"))
+    expected = sj[sj['NAMABRG'].str.contains('PULPEN')]
+    assert history['SJ_CREATED_ON'].tolist() == expected['SJ_CREATED_ON'].tolist()
+    assert sorted(data.master.names) == sorted(sj['NAMABRG'].unique())
+
+
+def with_blank_text(sj: pd.DataFrame) -> pd.DataFrame:
+    """Kolom teks dengan sel kosong (NaN) di baris bertanggal maksimum."""
+    return sj.assign(KETERANGAN=[np.nan if day % 2 else 'catatan' for day in range(len(sj))])
+
+
+def test_rerun_with_blank_text_adds_no_rows(tmp_path):
+    sj = with_blank_text(sj_frame())
+    refresher = IncrementalRefresher(tmp_path / "state", workers=1)
+    assert refresher.refresh(sj)["new_rows"] == len(sj)
+    assert refresher.refresh(sj)["new_rows"] == 0
+    assert len(pd.read_parquet(refresher.sj_dir)) == len(sj)
+
+
+def test_rerun_from_xlsx_adds_no_rows(tmp_path):
+    sj = with_blank_text(sj_frame())
+    sj.loc[sj.index[-1], 'KATEGORI'] = np.nan
+    path = tmp_path / "sj.xlsx"
+    write_xlsx(sj, path)
+    refresher = IncrementalRefresher(tmp_path / "state", workers=1)
+    refresher.refresh(read_sj(path))
+    assert refresher.refresh(read_sj(path))["new_rows"] == 0
+
+
+def test_new_row_on_max_date_is_kept(tmp_path):
+    sj = with_blank_text(sj_frame())
+    refresher = IncrementalRefresher(tmp_path / "state", workers=1)
+    refresher.refresh(sj)
+    extra = sj.iloc[[-1]].assign(HARGARATA=9999.0)
+    assert refresher.refresh(pd.concat([sj, extra], ignore_index=True))["new_rows"] == 1
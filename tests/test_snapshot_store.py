@@ -0,0 +1,74 @@
+import openpyxl
+import pandas as pd
+import pytest
+
+import data_source
+from data_source import LocalDriveClient, SnapshotStore
+
+
+class CountingClient(LocalDriveClient):
+    def __init__(self, root):
+        super().__init__(root)
+        self.downloads = 0
+
+    def download(self, file_id, mime_type, fh):
+        self.downloads += 1
+        super().download(file_id, mime_type, fh)
+
+
+def write_workbook(path, rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["NAMABRG", "HARGARATA"])
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    calls = []
+    stream_excel = data_source.stream_excel
+
+    def counting(fh, sheet_name=None):
+        calls.append(sheet_name)
+        return stream_excel(fh, sheet_name)
+
+    monkeypatch.setattr(data_source, "stream_excel", counting)
+    return calls
+
+
+def test_unchanged_file_is_not_downloaded_again(tmp_path, parses):
+    drive = tmp_path / "drive"
+    drive.mkdir()
+    write_workbook(drive / "sj.xlsx", [["KABEL", 1000]])
+    client = CountingClient(drive)
+
+    path, revision = SnapshotStore(client, tmp_path / "snap").ensure("sj")
+    written = path.stat().st_mtime_ns
+    # Store baru (mis. proses dashboard restart) tetap memakai snapshot di disk
+    again = SnapshotStore(client, tmp_path / "snap").ensure("sj")
+
+    assert again == (path, revision)
+    assert client.downloads == 1
+    assert len(parses) == 1
+    assert path.stat().st_mtime_ns == written
+
+
+def test_changed_file_rewrites_snapshot(tmp_path, parses):
+    drive = tmp_path / "drive"
+    drive.mkdir()
+    write_workbook(drive / "sj.xlsx", [["KABEL", 1000]])
+    client = CountingClient(drive)
+    store = SnapshotStore(client, tmp_path / "snap")
+    path, old_revision = store.ensure("sj")
+
+    write_workbook(drive / "sj.xlsx", [["KABEL", 1000], ["BAUT", 250]])
+    new_path, new_revision = store.ensure("sj")
+
+    assert new_path == path
+    assert new_revision != old_revision
+    assert SnapshotStore.stored_revision(path) == new_revision
+    assert client.downloads == 2
+    assert len(parses) == 2
+    assert pd.read_parquet(path)['NAMABRG'].tolist() == ['KABEL', 'BAUT']
@@ -0,0 +1,58 @@
+"""`stream_excel` harus setara jalur lama `read_excel` (pandas + `clean_frame`)."""
+import datetime as dt
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from data_source import EXCEL_NA_VALUES, read_excel, stream_excel
+from synthetic import synthetic_items, synthetic_pairs, synthetic_sj, write_xlsx
+
+
+def assert_same_parse(path):
+    with open(path, "rb") as fh:
+        expected = read_excel(fh)
+    with open(path, "rb") as fh:
+        actual = stream_excel(fh)
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+@pytest.mark.parametrize("kind", ["sj", "pairs"])
+def test_benchmark_exports(tmp_path, kind):
+    items = synthetic_items(300)
+    df = synthetic_sj(items, 2_000) if kind == "sj" else synthetic_pairs(items, 1_000)
+    path = tmp_path / f"{kind}.xlsx"
+    write_xlsx(df, path)
+    assert_same_parse(path)
+
+
+def test_edge_case_workbook(tmp_path):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append([None, " NAMABRG ", "KODEBARANG", "HARGARATA", "TOTALHARGA", "JUMLAH", "SJ_CREATED_ON",
+                  "KETERANGAN", "KETERANGAN", None])
+    sheet.append([0, "KABEL NYA", "K001", 12500, 25000.0, 2, dt.datetime(2026, 1, 5), "NA", "x", None])
+    sheet.append([])  # baris kosong di tengah data
+    sheet.append([1, "BAUT M10", 1002, -7500, "Rp 15,000", "3", "2026-02-01", "NULL", None, None])
+    sheet.append([2, "MUR M10", "K003", "Rp 1.250,50", "abc", "2.6", "bukan tanggal", "", "y", 1])
+    sheet.append([3, "PAKU", "K004", None, -3, None, None, "n/a", None, None])
+    sheet.append([None] * 10)  # baris kosong di ujung dibuang
+    path = tmp_path / "edge.xlsx"
+    workbook.save(path)
+    assert_same_parse(path)
+
+
+def test_na_text_matches_pandas(tmp_path):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["KETERANGAN", "CATATAN"])
+    for value in sorted(EXCEL_NA_VALUES - {""}):
+        sheet.append([value, "ok"])
+    # Variasi yang bukan NA bagi pandas harus tetap teks
+    for value in ["Na", "NONE", " NA", "N/A "]:
+        sheet.append([value, None])
+    path = tmp_path / "na.xlsx"
+    workbook.save(path)
+    assert_same_parse(path)
+    with open(path, "rb") as fh:
+        assert stream_excel(fh)['KETERANGAN'].notna().sum() == 4